@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import checks  # noqa: F401
+        from .db.sqlite import apply_sqlite_pragmas
+        from .template_backend import warm_up_templates
+        from .template_profiling import install_template_profiler
+
+        connection_created.connect(apply_sqlite_pragmas)
+        if settings.TEMPLATE_PROFILING:
+            install_template_profiler()
+        if settings.TEMPLATE_WARMUP:
+            warm_up_templates()
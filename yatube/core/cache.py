@@ -0,0 +1,387 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим кэшем.
+
+Бэкенд TwoTierCache оборачивает другой кэш из CACHES (LOCATION -
+его имя) и держит горячие мелкие ключи в памяти воркера, чтобы не
+ходить за ними по сети на каждый запрос:
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {'MAX_ENTRIES': 1000, 'LOCAL_TIMEOUT': 5,
+                        'VERSION_CHECK_INTERVAL': 1,
+                        'LOCAL_KEY_PREFIXES': ['posts:group:']},
+        },
+        'shared': {...},
+    }
+
+У каждого локального ключа есть версия в общем кэше. delete,
+delete_many и incr увеличивают версию только этого ключа. Копия
+в памяти помнит версию, с которой она была прочитана, и сверяет ее
+с общим кэшем не чаще раза в VERSION_CHECK_INTERVAL секунд, поэтому
+другой воркер видит удаление с задержкой не больше этого интервала,
+а остальные ключи в его памяти не трогаются.
+
+set и add считаются заполнением кэша после промаха и версию не меняют.
+Чужая перезапись через set видна в других воркерах только по истечении
+LOCAL_TIMEOUT, поэтому в LOCAL_KEY_PREFIXES стоит включать ключи,
+которые сбрасываются удалением или не меняются вовсе.
+
+То, что само кладется в общий кэш (например, страница для анонимов),
+собирается внутри bypass_local_tier(): копия в памяти могла еще
+не заметить удаление.
+"""
+import contextlib
+import contextvars
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+BACKEND = 'core.cache.TwoTierCache'
+
+VERSION_KEY_PREFIX = 'core:cache:version:'
+
+STAT_NAMES = ('hits', 'misses', 'evictions', 'expirations', 'invalidations')
+
+MISSING = object()
+
+local_tiers = {}
+
+local_tiers_guard = threading.Lock()
+
+local_tier_bypassed = contextvars.ContextVar(
+    'local_tier_bypassed', default=False
+)
+
+
+@contextlib.contextmanager
+def bypass_local_tier():
+    """Внутри блока все чтения идут в общий кэш мимо памяти процесса."""
+    token = local_tier_bypassed.set(True)
+    try:
+        yield
+    finally:
+        local_tier_bypassed.reset(token)
+
+
+class LocalTier:
+    """Ограниченный LRU-кэш процесса со сроком жизни записей.
+
+    Значения хранятся сериализованными, как в LocMemCache: запрос,
+    изменивший полученный объект, не портит его для других. Вместе
+    со значением хранятся его версия и время последней сверки.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats = dict.fromkeys(STAT_NAMES, 0)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get(self, key):
+        """Возвращает (значение, версия, время сверки) или None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, pickled, version, checked_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                self.stats['expirations'] += 1
+                return None
+            self.entries.move_to_end(key)
+            return pickled, version, checked_at
+
+    def set(self, key, pickled, timeout, version):
+        if timeout <= 0:
+            self.delete(key)
+            return
+        now = time.monotonic()
+        with self.lock:
+            self.entries[key] = (now + timeout, pickled, version, now)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def confirm(self, key):
+        """Отмечает, что версия записи только что сверена."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries[key] = entry[:3] + (time.monotonic(),)
+
+    def contains(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(
+                self.stats,
+                entries=len(self.entries),
+                max_entries=self.max_entries,
+            )
+
+
+def get_local_tier(name, max_entries):
+    """Память процесса для кэша name.
+
+    Django создает экземпляры бэкендов отдельно в каждом потоке,
+    поэтому сама память хранится на уровне модуля.
+    """
+    with local_tiers_guard:
+        if name not in local_tiers:
+            local_tiers[name] = LocalTier(max_entries)
+        return local_tiers[name]
+
+
+def reset_local_tiers():
+    """Очищает память и статистику всех двухуровневых кэшей процесса."""
+    with local_tiers_guard:
+        for tier in local_tiers.values():
+            tier.reset()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._version_check_interval = options.get(
+            'VERSION_CHECK_INTERVAL', 1
+        )
+        self._local_prefixes = tuple(options.get('LOCAL_KEY_PREFIXES', ('',)))
+        self._local = get_local_tier(location, self._max_entries)
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def stats(self):
+        return self._local.snapshot()
+
+    def _is_local(self, key):
+        return key.startswith(self._local_prefixes)
+
+    def _uses_local(self, key):
+        return self._is_local(key) and not local_tier_bypassed.get()
+
+    @staticmethod
+    def _version_key(key):
+        return f'{VERSION_KEY_PREFIX}{key}'
+
+    def _local_ttl(self, timeout):
+        expires_at = self.get_backend_timeout(timeout)
+        if expires_at is None:
+            return self._local_timeout
+        return min(self._local_timeout, expires_at - time.time())
+
+    def _store(self, key, value, version, ttl, key_version):
+        self._local.set(
+            self.make_key(key, version),
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            ttl,
+            key_version,
+        )
+
+    def _local_get(self, key, version):
+        """Значение из памяти процесса или MISSING.
+
+        Версия ключа сверяется с общим кэшем не чаще раза
+        в VERSION_CHECK_INTERVAL секунд.
+        """
+        local_key = self.make_key(key, version)
+        entry = self._local.get(local_key)
+        if entry is None:
+            self._local.count('misses')
+            return MISSING
+        pickled, key_version, checked_at = entry
+        if time.monotonic() - checked_at >= self._version_check_interval:
+            current = self.shared.get(self._version_key(key), version=version)
+            if current != key_version:
+                self._local.delete(local_key)
+                self._local.count('invalidations')
+                self._local.count('misses')
+                return MISSING
+            self._local.confirm(local_key)
+        self._local.count('hits')
+        return pickle.loads(pickled)
+
+    def _fetch(self, keys, version):
+        """Читает из общего кэша значения вместе с их версиями
+        и кладет локальные ключи в память процесса.
+        """
+        version_keys = [
+            self._version_key(key) for key in keys if self._uses_local(key)
+        ]
+        fetched = self.shared.get_many(
+            list(keys) + version_keys, version=version
+        )
+        found = {}
+        for key in keys:
+            if key not in fetched:
+                continue
+            found[key] = fetched[key]
+            if self._uses_local(key):
+                self._store(
+                    key, fetched[key], version, self._local_timeout,
+                    fetched.get(self._version_key(key)),
+                )
+        return found
+
+    def _bump_version(self, key, version):
+        """Увеличивает версию ключа: копии в памяти других воркеров
+        перестают совпадать с ней при следующей сверке.
+        """
+        version_key = self._version_key(key)
+        try:
+            return self.shared.incr(version_key, version=version)
+        except ValueError:
+            # Версия начинается со времени, а не с 1: после вытеснения
+            # ключа версии она не повторит уже выданное значение
+            initial = time.time_ns()
+            if self.shared.add(version_key, initial, None, version=version):
+                return initial
+            return self.shared.incr(version_key, version=version)
+
+    def get(self, key, default=None, version=None):
+        if not self._is_local(key):
+            return self.shared.get(key, default, version=version)
+        if self._uses_local(key):
+            value = self._local_get(key, version)
+            if value is not MISSING:
+                return value
+        return self._fetch([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            value = MISSING
+            if self._uses_local(key):
+                value = self._local_get(key, version)
+            if value is MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        if remote:
+            found.update(self._fetch(remote, version))
+        return found
+
+    def _current_versions(self, keys, version):
+        """Версии ключей до записи: если ключ удалят сразу после
+        записи, сохраненная копия не совпадет с новой версией.
+        """
+        version_keys = {key: self._version_key(key) for key in keys}
+        fetched = self.shared.get_many(
+            list(version_keys.values()), version=version
+        )
+        return {key: fetched.get(version_keys[key]) for key in keys}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self._is_local(key):
+            return self.shared.set(key, value, timeout, version=version)
+        key_version = self._current_versions([key], version)[key]
+        self.shared.set(key, value, timeout, version=version)
+        self._store(
+            key, value, version, self._local_ttl(timeout), key_version
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self._is_local(key):
+            return self.shared.add(key, value, timeout, version=version)
+        key_version = self._current_versions([key], version)[key]
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._store(
+                key, value, version, self._local_ttl(timeout), key_version
+            )
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        local_keys = [key for key in data if self._is_local(key)]
+        key_versions = self._current_versions(local_keys, version)
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key in local_keys:
+            self._store(
+                key, data[key], version, self._local_ttl(timeout),
+                key_versions[key],
+            )
+        return failed
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        if self._is_local(key):
+            key_version = self._bump_version(key, version)
+            self._store(
+                key, value, version, self._local_timeout, key_version
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._is_local(key):
+            self._local.delete(self.make_key(key, version))
+        return self.shared.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        if self._uses_local(key) and self._local.contains(
+                self.make_key(key, version)):
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        result = self.shared.delete(key, version=version)
+        if self._is_local(key):
+            self._local.delete(self.make_key(key, version))
+            self._bump_version(key, version)
+        return result
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        for key in keys:
+            if self._is_local(key):
+                self._local.delete(self.make_key(key, version))
+                self._bump_version(key, version)
+
+    def clear(self):
+        self.shared.clear()
+        self._local.clear()
+
+    def close(self, **kwargs):
+        # Общий кэш закрывается сам: он тоже есть в caches
+        pass
+
+
+def cache_stats():
+    """Статистика локальной памяти двухуровневых кэшей процесса."""
+    return {
+        alias: caches[alias].stats()
+        for alias, params in settings.CACHES.items()
+        if params['BACKEND'] == BACKEND
+    }
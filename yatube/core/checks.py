@@ -0,0 +1,171 @@
+"""Проверки настроек, заметно снижающих пропускную способность.
+
+Запускаются вместе с проверками безопасности:
+manage.py check --deploy, только они: manage.py check --deploy
+--tag performance. Проверки, которые обращаются к базе, Django
+запускает перед migrate и по manage.py check --tag database.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from django.db import DatabaseError, connections
+
+PERFORMANCE = 'performance'
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+TWO_TIER_CACHE = 'core.cache.TwoTierCache'
+
+DB_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.file',
+)
+
+POOLED_ENGINES_PREFIX = 'core.db.backends.'
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+# Доля запросов с метриками, выше которой их накладные расходы заметны
+MAX_PERF_SAMPLE_RATE = 0.1
+
+
+@register(PERFORMANCE, deploy=True)
+def check_debug(app_configs, **kwargs):
+    if settings.DEBUG:
+        return [Warning(
+            'DEBUG включен: Django хранит каждый SQL-запрос в памяти '
+            'и не кэширует шаблоны.',
+            hint='Используйте yatube.settings.prod.',
+            id='core.W001',
+        )]
+    return []
+
+
+@register(PERFORMANCE, deploy=True)
+def check_persistent_connections(app_configs, **kwargs):
+    return [
+        Warning(
+            f'База {alias!r} открывает соединение на каждый запрос.',
+            hint='Задайте CONN_MAX_AGE больше 0 '
+                 'или подключите пул из core.db.backends.',
+            id='core.W002',
+        )
+        for alias, database in settings.DATABASES.items()
+        if not database.get('CONN_MAX_AGE')
+        and not database['ENGINE'].startswith(POOLED_ENGINES_PREFIX)
+    ]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_cache_backend(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if backend == TWO_TIER_CACHE:
+        # Общим кэшем служит тот, что под локальным уровнем
+        shared = settings.CACHES['default'].get('LOCATION')
+        backend = settings.CACHES.get(shared, {}).get('BACKEND', backend)
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f'Кэш по умолчанию {backend} не общий для процессов: '
+            f'каждый воркер кэширует и сбрасывает страницы отдельно.',
+            hint='Настройте memcached или другой общий кэш в CACHES.',
+            id='core.W003',
+        )]
+    return []
+
+
+def uses_cached_loader(options):
+    loaders = options.get('loaders')
+    if loaders is None:
+        # Без явных загрузчиков Django сам включает кэш при debug=False
+        return not options.get('debug', settings.DEBUG)
+    return any(
+        loader == CACHED_LOADER
+        or isinstance(loader, (list, tuple)) and loader[0] == CACHED_LOADER
+        for loader in loaders
+    )
+
+
+@register(PERFORMANCE, deploy=True)
+def check_template_loaders(app_configs, **kwargs):
+    return [
+        Warning(
+            f'Шаблонизатор {engine["BACKEND"]} разбирает шаблоны '
+            f'с диска на каждый запрос.',
+            hint=f'Подключите {CACHED_LOADER}.',
+            id='core.W004',
+        )
+        for engine in settings.TEMPLATES
+        if engine['BACKEND'].endswith('DjangoTemplates')
+        and not uses_cached_loader(engine.get('OPTIONS', {}))
+    ]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_session_engine(app_configs, **kwargs):
+    if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+        return [Warning(
+            'Сессия читается из базы на каждый запрос.',
+            hint='Используйте '
+                 'django.contrib.sessions.backends.cached_db.',
+            id='core.W005',
+        )]
+    return []
+
+
+@register(PERFORMANCE, deploy=True)
+def check_instrumentation(app_configs, **kwargs):
+    warnings = []
+    if settings.TEMPLATE_PROFILING:
+        warnings.append(Warning(
+            'Профилирование шаблонов замедляет каждый include.',
+            hint='Выключите TEMPLATE_PROFILING.',
+            id='core.W006',
+        ))
+    if settings.PERF_SAMPLE_RATE > MAX_PERF_SAMPLE_RATE:
+        warnings.append(Warning(
+            f'Метрики собираются для {settings.PERF_SAMPLE_RATE:.0%} '
+            f'запросов.',
+            hint=f'Уменьшите PERF_SAMPLE_RATE до {MAX_PERF_SAMPLE_RATE} '
+                 f'или меньше.',
+            id='core.W007',
+        ))
+    return warnings
+
+
+@register(PERFORMANCE, deploy=True)
+def check_static_storage(app_configs, **kwargs):
+    if 'Manifest' not in settings.STATICFILES_STORAGE:
+        return [Warning(
+            'Имена статических файлов без хэша: браузер не может '
+            'кэшировать их надолго.',
+            hint='Используйте '
+                 'core.storage.CompressedManifestStaticFilesStorage.',
+            id='core.W008',
+        )]
+    return []
+
+
+@register(PERFORMANCE, Tags.database)
+def check_search_triggers(app_configs, **kwargs):
+    """Без триггеров FTS-индекс SQLite не видит новые и измененные
+    посты, а поиск уходит от них к устаревшим результатам.
+    """
+    from posts.search import missing_search_triggers
+
+    warnings = []
+    for alias in settings.DATABASES:
+        try:
+            missing = missing_search_triggers(connections[alias])
+        except DatabaseError:
+            continue
+        if missing:
+            warnings.append(Warning(
+                f'В базе {alias!r} нет триггеров поискового индекса: '
+                f'{", ".join(missing)}.',
+                hint='Выполните manage.py rebuild_search_index '
+                     f'--database {alias}.',
+                id='core.W009',
+            ))
+    return warnings
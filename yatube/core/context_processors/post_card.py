@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def post_card(request):
+    """Добавляет время жизни кэша карточки поста."""
+    return {
+        'post_card_cache_timeout': settings.POST_CARD_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,255 @@
+"""Пул соединений с базой внутри процесса.
+
+Бэкенды core.db.backends.sqlite3 и core.db.backends.postgresql -
+обычные бэкенды Django, которые при закрытии соединения возвращают его
+в пул, а при открытии берут из пула. Настройки пула задаются ключом
+POOL в описании базы:
+
+    'POOL': {'MAX_SIZE': 10, 'TIMEOUT': 5, 'MAX_LIFETIME': 1800,
+             'HEALTH_CHECK': True}
+
+Соединения возвращаются в пул, когда Django их закрывает: в конце
+каждого запроса при CONN_MAX_AGE = 0 или по истечении CONN_MAX_AGE.
+"""
+import os
+import threading
+import time
+
+from django.db import OperationalError
+
+from ..metrics import current_metrics
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 10,
+    # Сколько секунд ждать свободного соединения
+    'TIMEOUT': 5,
+    # Соединения старше этого срока (в секундах) закрываются
+    'MAX_LIFETIME': 30 * 60,
+    # Проверять соединение запросом перед выдачей
+    'HEALTH_CHECK': True,
+}
+
+
+class PooledConnection:
+    def __init__(self, raw):
+        self.raw = raw
+        self.created = time.monotonic()
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений с ожиданием свободного."""
+
+    def __init__(self, ping, max_size, timeout, max_lifetime,
+                 health_check):
+        self.ping = ping
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check = health_check
+        self.condition = threading.Condition()
+        self.idle = []
+        self.in_use = {}
+        self.stats = {
+            'checkouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'waits': 0,
+            'wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'timeouts': 0,
+        }
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.in_use)
+
+    def acquire(self, connect):
+        """Выдает соединение: свободное, новое (через connect())
+        или дождавшись возврата.
+        """
+        started = time.perf_counter()
+        with self.condition:
+            waited = False
+            while not self.idle and self.size >= self.max_size:
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise OperationalError(
+                        f'Нет свободного соединения в пуле за '
+                        f'{self.timeout} с (размер {self.max_size}).'
+                    )
+                self.condition.wait(remaining)
+            pooled = self.idle.pop() if self.idle else None
+            if pooled is None:
+                # Место в пуле занимается сразу, соединение создается
+                # вне блокировки
+                pooled = PooledConnection(None)
+            self.in_use[id(pooled)] = pooled
+            self.record_wait(waited, started)
+        return self.prepare(pooled, connect)
+
+    def record_wait(self, waited, started):
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.stats['checkouts'] += 1
+        if waited:
+            self.stats['waits'] += 1
+            self.stats['wait_ms'] += wait_ms
+            self.stats['max_wait_ms'] = max(
+                self.stats['max_wait_ms'], wait_ms
+            )
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.pool_wait_ms += wait_ms
+
+    def prepare(self, pooled, connect):
+        """Проверяет выданное соединение и при необходимости заменяет
+        его новым.
+        """
+        try:
+            if pooled.raw is not None and not self.is_healthy(pooled):
+                self.close_raw(pooled.raw)
+                pooled.raw = None
+                self.count('discarded')
+            if pooled.raw is None:
+                pooled.raw = connect()
+                pooled.created = time.monotonic()
+                self.count('created')
+        except Exception:
+            with self.condition:
+                del self.in_use[id(pooled)]
+                self.condition.notify()
+            raise
+        return pooled
+
+    def is_healthy(self, pooled):
+        if time.monotonic() - pooled.created > self.max_lifetime:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            self.ping(pooled.raw)
+        except Exception:
+            return False
+        return True
+
+    def release(self, pooled, discard=False):
+        """Возвращает соединение в пул или закрывает его."""
+        if not discard:
+            try:
+                pooled.raw.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self.close_raw(pooled.raw)
+            self.count('discarded')
+        with self.condition:
+            del self.in_use[id(pooled)]
+            if not discard:
+                self.idle.append(pooled)
+            self.condition.notify()
+
+    def count(self, name):
+        with self.condition:
+            self.stats[name] += 1
+
+    @staticmethod
+    def close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for pooled in idle:
+            self.close_raw(pooled.raw)
+
+    def snapshot(self):
+        with self.condition:
+            return dict(
+                self.stats,
+                wait_ms=round(self.stats['wait_ms'], 3),
+                max_wait_ms=round(self.stats['max_wait_ms'], 3),
+                idle=len(self.idle),
+                in_use=len(self.in_use),
+                max_size=self.max_size,
+            )
+
+
+# Пулы по псевдониму базы; после fork у процесса свои пулы
+pools = {}
+
+pools_lock = threading.Lock()
+
+
+def get_pool(alias, ping, options):
+    key = (alias, os.getpid())
+    with pools_lock:
+        if key not in pools:
+            options = {**POOL_DEFAULTS, **options}
+            pools[key] = ConnectionPool(
+                ping,
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                max_lifetime=options['MAX_LIFETIME'],
+                health_check=options['HEALTH_CHECK'],
+            )
+        return pools[key]
+
+
+def pool_stats():
+    """Статистика пулов текущего процесса по псевдонимам баз."""
+    pid = os.getpid()
+    with pools_lock:
+        current = {
+            alias: pool for (alias, owner), pool in pools.items()
+            if owner == pid
+        }
+    return {alias: pool.snapshot() for alias, pool in current.items()}
+
+
+def reset_pools():
+    """Закрывает свободные соединения и забывает все пулы."""
+    with pools_lock:
+        current = list(pools.values())
+        pools.clear()
+    for pool in current:
+        pool.close_idle()
+
+
+class PooledDatabaseWrapperMixin:
+    """Подмешивается к DatabaseWrapper бэкенда Django."""
+
+    def get_pool(self):
+        return get_pool(
+            self.alias,
+            self.ping_connection,
+            self.settings_dict.get('POOL', {}),
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pooled = self.get_pool().acquire(
+            lambda: super(
+                PooledDatabaseWrapperMixin, self
+            ).get_new_connection(conn_params)
+        )
+        return self.pooled.raw
+
+    @staticmethod
+    def ping_connection(raw):
+        cursor = raw.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def _close(self):
+        pooled = getattr(self, 'pooled', None)
+        if pooled is None or pooled.raw is not self.connection:
+            return super()._close()
+        self.pooled = None
+        # Соединение, закрытое посреди транзакции, Django еще считает
+        # своим, отдавать его другим нельзя
+        self.get_pool().release(pooled, discard=self.in_atomic_block)
@@ -0,0 +1,91 @@
+"""Чтение с реплик для view, которые ничего не пишут.
+
+View, обернутые в read_from_replica, читают из случайной базы из
+DATABASE_REPLICAS. Запись всегда идет в default. После изменяющего
+запроса ReplicaStickinessMiddleware ставит cookie, и пока она жива,
+все чтения этого браузера идут в default: пользователь сразу видит
+свой пост, даже если реплика еще отстает.
+"""
+import contextlib
+import contextvars
+import functools
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.cache import bypass_local_tier
+
+replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+# Сессии читаются только с основной базы: только что созданная сессия
+# могла еще не дойти до реплики
+PRIMARY_ONLY_APPS = ('sessions',)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def is_write_request(request):
+    """Изменяющий ли запрос. Пишущие view принимают только POST."""
+    return request.method not in SAFE_METHODS
+
+
+def is_sticky(request):
+    return settings.REPLICA_STICKY_COOKIE in request.COOKIES
+
+
+def read_from_replica(view):
+    """Разрешает view читать с реплики.
+
+    Изменяющие запросы и запросы браузеров, недавно что-то записавших,
+    читают из default.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or is_sticky(request):
+            return view(request, *args, **kwargs)
+        token = replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+    return wrapper
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Читает из default и внутри view с read_from_replica, а кэш -
+    из общего уровня мимо памяти процесса.
+
+    Нужно для всего, что кладется в общий кэш: данные с отстающей
+    реплики или из еще не сверенной копии в памяти прожили бы там
+    до конца таймаута.
+    """
+    token = replica_reads.set(False)
+    try:
+        with bypass_local_tier():
+            yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not replica_reads.get()
+                or model._meta.app_label in PRIMARY_ONLY_APPS):
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе объект, прочитанный с реплики, сохранялся бы в нее
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,84 @@
+"""Настройка SQLite для работы под несколькими воркерами.
+
+Каждое новое соединение получает прагмы из SQLITE_PRAGMAS: WAL
+позволяет читателям не ждать писателя, busy_timeout - ждать
+блокировку, а не сразу падать с «database is locked».
+
+Одновременно писать в SQLite может только одно соединение, а
+транзакция, начавшаяся с чтения, при попытке записи получает SQLITE_BUSY
+без ожидания. Поэтому записывающие view выстраиваются в очередь
+через блокировку файла рядом с базой (SQLITE_WRITE_LOCK).
+"""
+import contextlib
+import functools
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .routers import is_write_request
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+thread_locks = {}
+
+thread_locks_guard = threading.Lock()
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def write_lock_path(connection):
+    """Файл блокировки записи; None для базы в памяти."""
+    if connection.is_in_memory_db():
+        return None
+    return f'{connection.settings_dict["NAME"]}.write-lock'
+
+
+def get_thread_lock(key):
+    with thread_locks_guard:
+        return thread_locks.setdefault(key, threading.Lock())
+
+
+@contextlib.contextmanager
+def serialized_write(using=DEFAULT_DB_ALIAS):
+    """Пропускает в блок только одного писателя на базу: среди потоков
+    процесса и среди процессов на этой машине.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not settings.SQLITE_WRITE_LOCK:
+        yield
+        return
+    path = write_lock_path(connection)
+    with get_thread_lock(path or using):
+        if path is None or fcntl is None:
+            yield
+            return
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def serialize_writes(view):
+    """Выполняет изменяющие запросы к view по одному (см.
+    serialized_write). GET и HEAD проходят без очереди.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_write_request(request):
+            return view(request, *args, **kwargs)
+        with serialized_write():
+            return view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,49 @@
+"""Оценка числа строк в таблице по статистике планировщика.
+
+Точный COUNT(*) по большой таблице читает весь индекс, а планировщик
+уже хранит примерное число строк: PostgreSQL в pg_class.reltuples
+(обновляет autovacuum), SQLite в sqlite_stat1 (обновляет ANALYZE).
+Оценка отстает от реальности на изменения с последнего сбора
+статистики, поэтому годится только там, где точность не важна.
+"""
+from django.db import DatabaseError
+
+
+def estimate_table_rows(connection, table):
+    """Возвращает оценку числа строк таблицы или None, если
+    статистики нет или база ее не поддерживает.
+    """
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [connection.ops.quote_name(table)],
+                )
+            elif connection.vendor == 'sqlite':
+                # Первое число в stat - количество строк таблицы,
+                # оно одинаково для всех ее индексов
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table],
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 нет, пока ANALYZE ни разу не запускался
+        return None
+    if row is None:
+        return None
+    rows = int(float(str(row[0]).split()[0]))
+    # reltuples = -1 (PostgreSQL 14+): таблицу еще не анализировали
+    return rows if rows >= 0 else None
+
+
+def analyze_tables(connection, tables):
+    """Обновляет статистику планировщика для таблиц."""
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
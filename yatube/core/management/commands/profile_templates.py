@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core.metrics import registry
+from core.template_profiling import install_template_profiler
+
+
+class Command(BaseCommand):
+    help = (
+        'Запрашивает страницы тестовым клиентом и выводит время '
+        'рендеринга каждого шаблона и include.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*', default=['/'], help='Адреса страниц.'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        client = Client()
+        registry.reset()
+        install_template_profiler()
+        with override_settings(PERF_SAMPLE_RATE=1):
+            for path in options['paths']:
+                for attempt in range(options['repeat']):
+                    # Параметр в адресе обходит кэш страниц
+                    client.get(path, {'profile': attempt})
+        self.stdout.write(
+            f'{"шаблон":<45} {"рендеров":>9} {"всего, мс":>10} '
+            f'{"своё, мс":>10}'
+        )
+        for name, stat in registry.template_snapshot().items():
+            self.stdout.write(
+                f'{name:<45} {stat["renders"]:>9} '
+                f'{stat["mean_total_ms"]:>10.3f} '
+                f'{stat["mean_self_ms"]:>10.3f}'
+            )
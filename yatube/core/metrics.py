@@ -0,0 +1,176 @@
+"""Сбор метрик запросов: число и время SQL, время шаблонов и общее,
+а при включенном профилировании - время каждого шаблона.
+
+Метрики копятся в памяти процесса, у каждого воркера свои.
+"""
+import bisect
+import contextvars
+import threading
+import time
+
+# Верхние границы корзин гистограммы времени ответа, мс
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+current_metrics = contextvars.ContextVar('current_metrics', default=None)
+
+
+class TemplateProfile:
+    """Время рендеринга по шаблонам в пределах одного запроса.
+
+    Для каждого шаблона копятся число рендеров, полное время и
+    собственное время без вложенных include. Родитель из extends
+    рендерится внутри дочернего шаблона и отдельно не учитывается.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        # Время вложенных шаблонов для каждого уровня вложенности
+        self.children_ms = [0.0]
+
+    def measure(self, name, render, *args):
+        self.children_ms.append(0.0)
+        started = time.perf_counter()
+        try:
+            return render(*args)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            children = self.children_ms.pop()
+            self.children_ms[-1] += elapsed
+            stat = self.stats.setdefault(name, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] += elapsed - children
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.template_ms = 0.0
+        self.total_ms = 0.0
+        # Ожидание свободного соединения в пуле базы
+        self.pool_wait_ms = 0.0
+        self.templates = TemplateProfile()
+
+    @property
+    def sql_count(self):
+        return len(self.queries)
+
+    @property
+    def sql_ms(self):
+        return sum(duration for _, duration in self.queries)
+
+    def record_query(self, execute, sql, params, many, context):
+        """Обертка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, (time.perf_counter() - started) * 1000)
+            )
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def top_queries(self, limit):
+        return sorted(
+            self.queries, key=lambda query: query[1], reverse=True
+        )[:limit]
+
+    def server_timing(self):
+        return ', '.join((
+            f'sql;dur={self.sql_ms:.1f};desc="{self.sql_count} queries"',
+            f'db-wait;dur={self.pool_wait_ms:.1f}',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'total;dur={self.total_ms:.1f}',
+        ))
+
+
+class ViewHistogram:
+    """Накопленная статистика одного view."""
+
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.sql_count = 0
+
+    def add(self, metrics):
+        self.requests += 1
+        self.buckets[bisect.bisect_left(BUCKETS_MS, metrics.total_ms)] += 1
+        self.total_ms += metrics.total_ms
+        self.sql_ms += metrics.sql_ms
+        self.template_ms += metrics.template_ms
+        self.sql_count += metrics.sql_count
+
+    def as_dict(self):
+        labels = [f'le_{bound}' for bound in BUCKETS_MS] + ['inf']
+        return {
+            'requests': self.requests,
+            'buckets_ms': dict(zip(labels, self.buckets)),
+            'mean_total_ms': round(self.total_ms / self.requests, 3),
+            'mean_sql_ms': round(self.sql_ms / self.requests, 3),
+            'mean_template_ms': round(self.template_ms / self.requests, 3),
+            'mean_sql_count': round(self.sql_count / self.requests, 2),
+        }
+
+
+class MetricsRegistry:
+    """Гистограммы по именам view и профили шаблонов, общие для потоков
+    процесса.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.templates = {}
+
+    def add(self, view_name, metrics):
+        with self.lock:
+            self.views.setdefault(view_name, ViewHistogram()).add(metrics)
+            for name, (count, total_ms, self_ms) in (
+                    metrics.templates.stats.items()):
+                stat = self.templates.setdefault(name, [0, 0.0, 0.0])
+                stat[0] += count
+                stat[1] += total_ms
+                stat[2] += self_ms
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: histogram.as_dict()
+                for name, histogram in sorted(self.views.items())
+            }
+
+    def template_snapshot(self):
+        """Профили шаблонов, самые дорогие по собственному времени
+        первыми.
+        """
+        with self.lock:
+            stats = sorted(
+                self.templates.items(),
+                key=lambda item: item[1][2],
+                reverse=True,
+            )
+            return {
+                name: {
+                    'renders': count,
+                    'mean_total_ms': round(total_ms / count, 3),
+                    'mean_self_ms': round(self_ms / count, 3),
+                    'self_ms': round(self_ms, 3),
+                }
+                for name, (count, total_ms, self_ms) in stats
+            }
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.templates.clear()
+
+
+registry = MetricsRegistry()
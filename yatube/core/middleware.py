@@ -0,0 +1,99 @@
+import contextlib
+import logging
+import random
+
+from django.conf import settings
+from django.db import connections
+
+from .db.routers import is_write_request
+from .metrics import RequestMetrics, current_metrics, registry
+
+logger = logging.getLogger('core.performance')
+
+
+class RequestMetricsMiddleware:
+    """Замеряет SQL, рендеринг шаблонов и общее время запроса.
+
+    Замеряется доля запросов PERF_SAMPLE_RATE. Для них добавляется
+    заголовок Server-Timing, статистика попадает в гистограммы,
+    а запросы дольше PERF_SLOW_REQUEST_MS пишутся в лог вместе
+    с самыми долгими SQL-запросами.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PERF_SAMPLE_RATE
+        self.slow_request_ms = settings.PERF_SLOW_REQUEST_MS
+        self.slow_queries_logged = settings.PERF_SLOW_QUERIES_LOGGED
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        metrics.finish()
+        view_name = self.view_name(request)
+        registry.add(view_name, metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        if metrics.total_ms >= self.slow_request_ms:
+            self.log_slow_request(request, view_name, metrics)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '<unresolved>'
+        return match.view_name
+
+    def log_slow_request(self, request, view_name, metrics):
+        queries = '\n'.join(
+            f'  {duration:.1f} мс: {sql}'
+            for sql, duration in metrics.top_queries(
+                self.slow_queries_logged
+            )
+        )
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.1f мс, SQL: %d за %.1f мс, '
+            'шаблоны: %.1f мс\n%s',
+            request.method,
+            request.get_full_path(),
+            view_name,
+            metrics.total_ms,
+            metrics.sql_count,
+            metrics.sql_ms,
+            metrics.template_ms,
+            queries,
+        )
+
+
+class ReplicaStickinessMiddleware:
+    """После изменяющего запроса на REPLICA_STICKY_SECONDS переводит
+    чтения этого браузера на основную базу (см. core.db.routers).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.DATABASE_REPLICAS
+                and is_write_request(request)
+                and response.status_code < 500):
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,49 @@
+import gzip
+import io
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.txt', '.html', '.json', '.ico', '.map',
+)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище статики с хэшем в имени файла и копиями .gz рядом.
+
+    Веб-сервер отдает готовый .gz (gzip_static в nginx) и не сжимает
+    файл на каждый запрос, а хэш в имени позволяет кэшировать
+    статику в браузере бессрочно.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in hashed_names.values():
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        """Пишет name.gz, если сжатие заметно уменьшает файл."""
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+        # gzip.compress принимает mtime только с Python 3.8; нулевое
+        # время дает одинаковый .gz при каждом collectstatic
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9,
+                           mtime=0) as archive:
+            archive.write(content)
+        compressed = buffer.getvalue()
+        if len(compressed) < len(content) * 0.95:
+            with open(path + '.gz', 'wb') as target:
+                target.write(compressed)
+        elif os.path.exists(path + '.gz'):
+            os.remove(path + '.gz')
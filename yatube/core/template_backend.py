@@ -0,0 +1,73 @@
+import os
+import time
+
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+from .metrics import current_metrics
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+class TimedTemplate:
+    """Шаблон, добавляющий время рендеринга к метрикам запроса."""
+
+    def __init__(self, wrapped):
+        # Не self.template: этот атрибут обертка должна пробрасывать
+        # к шаблону бэкенда, как и остальные
+        self.wrapped = wrapped
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return self.wrapped.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.wrapped.render(context, request)
+        finally:
+            metrics.template_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django с замером времени рендеринга.
+
+    Замеряется только шаблон верхнего уровня: include и extends
+    рендерятся внутри него и повторно не считаются.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def template_names(directory):
+    """Имена всех шаблонов в каталоге относительно него."""
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith(TEMPLATE_EXTENSIONS):
+                yield os.path.relpath(
+                    os.path.join(root, filename), directory
+                ).replace(os.sep, '/')
+
+
+def warm_up_templates():
+    """Компилирует все шаблоны из каталогов DIRS движков Django.
+
+    С кэширующим загрузчиком скомпилированные шаблоны остаются
+    в памяти, и первый запрос не тратит время на разбор.
+    Синтаксическая ошибка в шаблоне остановит запуск.
+    """
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for directory in backend.engine.dirs:
+            for name in template_names(directory):
+                backend.get_template(name)
+                compiled += 1
+    return compiled
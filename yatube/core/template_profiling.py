@@ -0,0 +1,25 @@
+"""Профилирование рендеринга отдельных шаблонов.
+
+Подменяет django.template.base.Template.render, через который
+рендерятся и шаблоны верхнего уровня, и каждый include. Тестовое
+окружение Django подменяет Template._render, поэтому с ним
+профилирование не конфликтует.
+"""
+from django.template.base import Template
+
+from .metrics import current_metrics
+
+original_render = Template.render
+
+
+def profiled_render(self, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return original_render(self, context)
+    return metrics.templates.measure(
+        self.name or '<string>', original_render, self, context
+    )
+
+
+def install_template_profiler():
+    Template.render = profiled_render
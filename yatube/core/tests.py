@@ -0,0 +1,672 @@
+import gzip
+import json
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connection,
+                       connections, transaction)
+from django.db.utils import ConnectionHandler
+from django.test import (Client, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.cache import get_cached_author_posts_count
+from posts.models import Group, Post
+
+from . import checks
+from .cache import (LocalTier, TwoTierCache, bypass_local_tier,
+                    reset_local_tiers)
+from .db.pool import ConnectionPool, pool_stats, reset_pools
+from .db.routers import ReplicaRouter, primary_reads, replica_reads
+from .db.sqlite import serialized_write
+from .metrics import registry
+from .storage import CompressedManifestStaticFilesStorage
+from .template_backend import template_names, warm_up_templates
+
+User = get_user_model()
+
+CONCURRENCY_ALIAS = 'concurrency'
+
+REPLICA_ALIAS = 'replica'
+
+TWO_TIER_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 2,
+            'LOCAL_TIMEOUT': 60,
+            'VERSION_CHECK_INTERVAL': 0,
+            'LOCAL_KEY_PREFIXES': ['hot:'],
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-shared',
+    },
+}
+
+
+def write_rows(rows, errors):
+    """Пишет строки так же, как view: чтение и запись в одной
+    транзакции, под блокировкой записи.
+    """
+    connection = connections[CONCURRENCY_ALIAS]
+    try:
+        for _ in range(rows):
+            with serialized_write(CONCURRENCY_ALIAS):
+                with transaction.atomic(using=CONCURRENCY_ALIAS):
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT COUNT(*) FROM items')
+                        count = cursor.fetchone()[0]
+                        time.sleep(0.005)
+                        cursor.execute(
+                            'INSERT INTO items (value) VALUES (%s)', [count]
+                        )
+    except Exception as error:
+        errors.put(repr(error))
+
+
+def hold_write_transaction(started, seconds):
+    """Держит открытую транзакцию записи seconds секунд."""
+    connection = connections[CONCURRENCY_ALIAS]
+    with serialized_write(CONCURRENCY_ALIAS):
+        with transaction.atomic(using=CONCURRENCY_ALIAS):
+            with connection.cursor() as cursor:
+                cursor.execute('INSERT INTO items (value) VALUES (0)')
+            started.set()
+            time.sleep(seconds)
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff_user = User.objects.create_user(
+            username='staff', is_staff=True
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(RequestMetricsTests.staff_user)
+        registry.reset()
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с SQL, шаблонами и общим временем."""
+        response = self.guest_client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for metric in ('sql;dur=', 'tpl;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        """Запросы вне выборки не замеряются."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(registry.snapshot(), {})
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged(self):
+        """Медленные запросы пишутся в лог вместе с SQL."""
+        with self.assertLogs('core.performance', 'WARNING') as logs:
+            self.guest_client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_metrics_endpoint_is_for_staff_only(self):
+        """Гистограммы доступны только персоналу."""
+        client = Client()
+        client.force_login(RequestMetricsTests.user)
+        for client in (self.guest_client, client):
+            with self.subTest(client=client):
+                response = client.get(reverse('core:metrics'))
+                self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_metrics_endpoint_aggregates_views(self):
+        """Гистограммы копят число запросов и SQL по каждому view."""
+        for _ in range(3):
+            self.guest_client.get(reverse('posts:index'))
+        response = self.staff_client.get(reverse('core:metrics'))
+        index = response.json()['views']['posts:index']
+        self.assertEqual(index['requests'], 3)
+        self.assertEqual(sum(index['buckets_ms'].values()), 3)
+        self.assertGreater(index['mean_template_ms'], 0)
+
+    def test_includes_are_profiled(self):
+        """Профиль шаблонов учитывает каждый include отдельно."""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.staff_client.get(reverse('core:metrics'))
+        templates = response.json()['templates']
+        for name in ('posts/index.html', 'includes/header.html',
+                     'posts/includes/paginator.html'):
+            with self.subTest(name=name):
+                self.assertEqual(templates[name]['renders'], 1)
+
+
+class TemplateWarmUpTests(TestCase):
+    def test_all_project_templates_are_compiled(self):
+        """Прогрев компилирует все шаблоны из каталога templates."""
+        names = list(template_names(settings.TEMPLATES_DIR))
+        self.assertIn('posts/includes/paginator.html', names)
+        self.assertEqual(warm_up_templates(), len(names))
+
+
+class PerformanceChecksTests(SimpleTestCase):
+    def run_checks(self):
+        return {
+            warning.id
+            for check in (
+                checks.check_debug,
+                checks.check_persistent_connections,
+                checks.check_cache_backend,
+                checks.check_template_loaders,
+                checks.check_session_engine,
+                checks.check_instrumentation,
+                checks.check_static_storage,
+            )
+            for warning in check(None)
+        }
+
+    def test_dev_settings_are_flagged(self):
+        """Настройки разработки помечаются как медленные."""
+        with override_settings(DEBUG=True):
+            self.assertEqual(
+                self.run_checks(),
+                {f'core.W00{number}' for number in range(1, 9)},
+            )
+
+    @mock.patch.dict(os.environ, DJANGO_SECRET_KEY='secret')
+    def test_prod_settings_pass(self):
+        """Боевой профиль проходит все проверки производительности."""
+        from yatube.settings import prod
+
+        names = (
+            'DEBUG', 'DATABASES', 'CACHES', 'TEMPLATES', 'SESSION_ENGINE',
+            'TEMPLATE_PROFILING', 'PERF_SAMPLE_RATE', 'STATICFILES_STORAGE',
+        )
+        with override_settings(
+                **{name: getattr(prod, name) for name in names}):
+            self.assertEqual(self.run_checks(), set())
+
+
+class SearchTriggersCheckTests(TestCase):
+    def test_missing_trigger_is_flagged(self):
+        """Удаленный триггер FTS помечается, полный набор проходит."""
+        self.assertEqual(checks.check_search_triggers(None), [])
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_au')
+        warnings = checks.check_search_triggers(None)
+        self.assertEqual([warning.id for warning in warnings], ['core.W009'])
+        self.assertIn('posts_post_fts_au', warnings[0].msg)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        descriptor, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(reset_pools)
+
+    def connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def make_pool(self, **options):
+        options = {
+            'max_size': 1,
+            'timeout': 1,
+            'max_lifetime': 60,
+            'health_check': True,
+            **options,
+        }
+        return ConnectionPool(
+            lambda raw: raw.execute('SELECT 1'), **options
+        )
+
+    def test_backend_reuses_connections(self):
+        """Бэкенд с пулом отдает закрытое соединение следующему."""
+        handler = ConnectionHandler({
+            'default': {
+                'ENGINE': 'core.db.backends.sqlite3',
+                'NAME': self.path,
+                'POOL': {'MAX_SIZE': 2},
+            },
+        })
+        wrapper = handler['default']
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        wrapper.close()
+        stats = pool_stats()['default']
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['idle'], 1)
+
+    def test_broken_connection_is_replaced(self):
+        """Соединение, не прошедшее проверку, заменяется новым."""
+        pool = self.make_pool()
+        pooled = pool.acquire(self.connect)
+        broken = pooled.raw
+        pool.release(pooled)
+        broken.close()
+        pooled = pool.acquire(self.connect)
+        self.assertIsNot(pooled.raw, broken)
+        self.assertEqual(pool.snapshot()['discarded'], 1)
+
+    def test_checkout_waits_for_release(self):
+        """При исчерпании пула соединение ждут, а время ожидания
+        попадает в статистику.
+        """
+        pool = self.make_pool()
+        pooled = pool.acquire(self.connect)
+        timer = threading.Timer(0.05, pool.release, [pooled])
+        timer.start()
+        self.addCleanup(timer.join)
+        self.assertIs(pool.acquire(self.connect).raw, pooled.raw)
+        stats = pool.snapshot()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_ms'], 0)
+
+    def test_checkout_times_out(self):
+        """Если соединение не вернули за TIMEOUT, выдается ошибка."""
+        pool = self.make_pool(timeout=0.05)
+        pool.acquire(self.connect)
+        with self.assertRaises(OperationalError):
+            pool.acquire(self.connect)
+        self.assertEqual(pool.snapshot()['timeouts'], 1)
+
+
+class SQLiteConcurrencyTests(SimpleTestCase):
+    """Несколько процессов работают с одной файловой базой SQLite."""
+
+    def setUp(self):
+        descriptor, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        for suffix in ('', '-wal', '-shm', '.write-lock'):
+            self.addCleanup(self.remove, path + suffix)
+        connections.databases[CONCURRENCY_ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+        }
+        self.addCleanup(connections.databases.pop, CONCURRENCY_ALIAS)
+        self.connection = connections[CONCURRENCY_ALIAS]
+        self.addCleanup(self.forget_connection)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER)'
+            )
+        # Открытое соединение нельзя наследовать через fork
+        self.connection.close()
+        self.context = multiprocessing.get_context('fork')
+
+    def forget_connection(self):
+        self.connection.close()
+        delattr(connections._connections, CONCURRENCY_ALIAS)
+
+    @staticmethod
+    def remove(path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def count_items(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM items')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        """Новое соединение получает WAL и остальные прагмы."""
+        with self.connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_concurrent_writers_do_not_fail(self):
+        """Писатели из разных процессов не получают database is locked."""
+        errors = self.context.Queue()
+        workers = [
+            self.context.Process(target=write_rows, args=(10, errors))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        self.assertTrue(errors.empty(), errors.get() if not errors.empty()
+                        else '')
+        self.assertEqual(self.count_items(), 40)
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT value FROM items ORDER BY id')
+            values = [row[0] for row in cursor.fetchall()]
+        # Каждая транзакция видела все предыдущие записи
+        self.assertEqual(values, list(range(40)))
+
+    def test_readers_do_not_wait_for_writer(self):
+        """Чтение не ждет открытую транзакцию записи в другом процессе."""
+        started = self.context.Event()
+        writer = self.context.Process(
+            target=hold_write_transaction, args=(started, 1)
+        )
+        writer.start()
+        self.assertTrue(started.wait(10))
+        reading_started = time.perf_counter()
+        self.assertEqual(self.count_items(), 0)
+        self.assertLess(time.perf_counter() - reading_started, 0.5)
+        writer.join(10)
+        self.assertEqual(self.count_items(), 1)
+
+
+def load_settings(module, **environ):
+    """Загружает профиль настроек в отдельном процессе с заданным
+    окружением и возвращает DATABASES и DATABASE_REPLICAS.
+    """
+    code = (
+        'import json, importlib; '
+        f'settings = importlib.import_module({module!r}); '
+        'print(json.dumps({"databases": sorted(settings.DATABASES), '
+        '"replicas": settings.DATABASE_REPLICAS, '
+        '"conn_max_age": {alias: db["CONN_MAX_AGE"] '
+        'for alias, db in settings.DATABASES.items()}}))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, **environ},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise AssertionError(result.stderr)
+    return json.loads(result.stdout)
+
+
+class SettingsProfilesTests(SimpleTestCase):
+    def test_profiles_keep_replicas(self):
+        """Боевой и замерочный профили сохраняют реплики из окружения."""
+        for module in ('yatube.settings.prod', 'yatube.settings.bench'):
+            with self.subTest(module=module):
+                loaded = load_settings(
+                    module,
+                    DJANGO_SECRET_KEY='secret',
+                    DJANGO_DB_REPLICAS='/tmp/r1.sqlite3',
+                )
+                self.assertEqual(
+                    loaded['databases'], ['default', 'replica_0']
+                )
+                self.assertEqual(loaded['replicas'], ['replica_0'])
+                self.assertEqual(
+                    set(loaded['conn_max_age'].values()), {60}
+                )
+
+    def test_prod_requires_secret_key(self):
+        """Боевой профиль не загружается без DJANGO_SECRET_KEY,
+        замерочный обходится ключом из base.
+        """
+        environ = {
+            name: value for name, value in os.environ.items()
+            if name != 'DJANGO_SECRET_KEY'
+        }
+        with mock.patch.dict(os.environ, environ, clear=True):
+            with self.assertRaisesRegex(AssertionError, 'DJANGO_SECRET_KEY'):
+                load_settings('yatube.settings.prod')
+            load_settings('yatube.settings.bench')
+
+
+class CompressedStaticStorageTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=directory.name, base_url='/static/'
+        )
+
+    def collect(self, files):
+        """Кладет файлы в STATIC_ROOT и прогоняет post_process."""
+        for name, content in files.items():
+            self.storage.save(name, ContentFile(content))
+        paths = {name: (self.storage, name) for name in files}
+        return {
+            name: hashed_name
+            for name, hashed_name, processed
+            in self.storage.post_process(paths)
+        }
+
+    def test_compressible_file_gets_gz(self):
+        """Рядом с хэшированным файлом пишется воспроизводимый .gz,
+        несжимаемый файл остается без него.
+        """
+        text = b'body { color: black; }\n' * 100
+        hashed = self.collect({
+            'site.css': text, 'noise.js': os.urandom(2048),
+        })
+        path = self.storage.path(hashed['site.css'])
+        with open(path + '.gz', 'rb') as archive:
+            compressed = archive.read()
+        self.assertEqual(gzip.decompress(compressed), text)
+        # Нулевое время в заголовке: архив не меняется между сборками
+        self.assertEqual(compressed[4:8], bytes(4))
+        self.assertFalse(
+            os.path.exists(self.storage.path(hashed['noise.js']) + '.gz')
+        )
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA_ALIAS])
+class ReplicaRoutingTests(TestCase):
+    """Реплика - отдельный файл SQLite, снятый с основной базы до
+    создания тестовых данных, то есть отстающий от нее.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        descriptor, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        connections.databases[REPLICA_ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(cls.replica_path)
+        primary.connection.backup(target)
+        target.close()
+        # Читатель есть и на реплике: иначе его запросы были бы анонимными
+        cls.reader = User.objects.create_user(username='reader')
+        cls.reader.save(using=REPLICA_ALIAS)
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Пост на основной базе')
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA_ALIAS].close()
+        delattr(connections._connections, REPLICA_ALIAS)
+        connections.databases.pop(REPLICA_ALIAS)
+        os.remove(cls.replica_path)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(ReplicaRoutingTests.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(ReplicaRoutingTests.reader)
+        cache.clear()
+
+    def test_read_only_views_use_replica(self):
+        """Ленты читают с реплики, которая еще не получила пост."""
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_cache_fills_use_primary(self):
+        """Страницы для кэша анонимов, группы и счетчики постов
+        собираются по основной базе, а не по отстающей реплике.
+        """
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=self.user, text='Пост', group=group)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 2)
+        response = self.reader_client.get(
+            reverse('posts:group_list', kwargs={'slug': group.slug})
+        )
+        self.assertEqual(response.context['group'].posts_count, 1)
+        self.assertEqual(get_cached_author_posts_count(self.user), 2)
+
+    def test_author_reads_own_writes(self):
+        """После записи автор читает из основной базы и видит пост."""
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_follow_forms_stick_to_primary(self):
+        """Подписка и отписка ставят cookie основной базы
+        и проходят через очередь записи.
+        """
+        urls = (
+            reverse('posts:profile_follow', args=[self.user.username]),
+            reverse('posts:profile_unfollow', args=[self.user.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                client = Client()
+                client.force_login(ReplicaRoutingTests.reader)
+                with mock.patch(
+                    'core.db.sqlite.serialized_write',
+                    wraps=serialized_write,
+                ) as write:
+                    response = client.post(url)
+                write.assert_called_once_with()
+                self.assertIn(
+                    settings.REPLICA_STICKY_COOKIE, response.cookies
+                )
+
+    def test_writes_and_sessions_stay_on_primary(self):
+        """Запись и сессии всегда идут в основную базу."""
+        router = ReplicaRouter()
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Post), REPLICA_ALIAS)
+            self.assertIsNone(router.db_for_read(Session))
+            post = Post(text='Пост с реплики')
+            post._state.db = REPLICA_ALIAS
+            self.assertEqual(
+                router.db_for_write(Post, instance=post), DEFAULT_DB_ALIAS
+            )
+        finally:
+            replica_reads.reset(token)
+
+
+@override_settings(CACHES=TWO_TIER_CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        reset_local_tiers()
+        self.cache = caches['default']
+        self.shared = caches['shared']
+        self.shared.clear()
+
+    def other_worker(self):
+        """Тот же кэш в другом процессе: своя память, общий кэш."""
+        worker = TwoTierCache('shared', TWO_TIER_CACHES['default'])
+        worker._local = LocalTier(worker._max_entries)
+        return worker
+
+    def test_hot_key_is_served_from_memory(self):
+        """Горячий ключ читается без обращения к общему кэшу,
+        прочие ключи идут мимо памяти процесса.
+        """
+        self.cache.set('hot:group', {'title': 'Группа'})
+        self.cache.set('page:index', 'страница')
+        self.shared.delete('hot:group')
+        group = self.cache.get('hot:group')
+        self.assertEqual(group, {'title': 'Группа'})
+        # Изменение полученного объекта не портит копию в памяти
+        group['title'] = 'Другая'
+        self.assertEqual(self.cache.get('hot:group'), {'title': 'Группа'})
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['entries']), (2, 1))
+
+    def test_delete_invalidates_other_workers(self):
+        """Удаление ключа в одном воркере сбрасывает память других."""
+        worker = self.other_worker()
+        self.cache.set('hot:post', 'старый текст')
+        self.assertEqual(worker.get('hot:post'), 'старый текст')
+        self.cache.delete('hot:post')
+        self.assertIsNone(worker.get('hot:post'))
+        self.assertEqual(worker.stats()['invalidations'], 1)
+        # Собственная запись не сбрасывает память записавшего
+        self.assertEqual(self.cache.stats()['invalidations'], 0)
+
+    def test_delete_keeps_other_keys_in_memory(self):
+        """Удаление сбрасывает в других воркерах только этот ключ."""
+        worker = self.other_worker()
+        self.cache.set_many({'hot:a': 'первый', 'hot:b': 'второй'})
+        worker.get_many(['hot:a', 'hot:b'])
+        self.cache.delete('hot:b')
+        # Значение, измененное в обход версий, остается в памяти
+        self.shared.set('hot:a', 'из общего кэша')
+        self.assertEqual(worker.get('hot:a'), 'первый')
+        self.assertIsNone(worker.get('hot:b'))
+        self.assertEqual(worker.stats()['invalidations'], 1)
+
+    def test_bypass_reads_shared_cache(self):
+        """Внутри bypass_local_tier и primary_reads память процесса
+        не читается.
+        """
+        self.cache.set('hot:group', 'в памяти')
+        self.shared.set('hot:group', 'в общем кэше')
+        self.assertEqual(self.cache.get('hot:group'), 'в памяти')
+        with bypass_local_tier():
+            self.assertEqual(self.cache.get('hot:group'), 'в общем кэше')
+        with primary_reads():
+            self.assertEqual(
+                self.cache.get_many(['hot:group']),
+                {'hot:group': 'в общем кэше'},
+            )
+
+    def test_memory_is_bounded_lru(self):
+        """Сверх MAX_ENTRIES вытесняется давно не читанный ключ."""
+        self.cache.set_many({'hot:a': 1, 'hot:b': 2})
+        self.cache.get('hot:a')
+        self.cache.set('hot:c', 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(
+            self.cache.get_many(['hot:a', 'hot:b', 'hot:c']),
+            {'hot:a': 1, 'hot:b': 2, 'hot:c': 3},
+        )
+
+    def test_local_copy_expires(self):
+        """Копия в памяти живет не дольше таймаута записи."""
+        self.cache.set('hot:counter', 1, timeout=0.05)
+        self.shared.set('hot:counter', 2)
+        time.sleep(0.1)
+        self.assertEqual(self.cache.get('hot:counter'), 2)
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_shared_backend_is_checked(self):
+        """Проверка кэша смотрит на общий кэш под локальным уровнем."""
+        self.assertEqual(
+            [warning.id for warning in checks.check_cache_backend(None)],
+            ['core.W003'],
+        )
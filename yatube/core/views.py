@@ -0,0 +1,23 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .cache import cache_stats
+from .db.pool import pool_stats
+from .metrics import BUCKETS_MS, registry
+
+
+@staff_member_required
+def metrics(request):
+    """Гистограммы времени ответа по view, профили шаблонов,
+    статистика пулов соединений и локального кэша текущего процесса.
+    """
+    return JsonResponse(
+        {
+            'buckets_ms': BUCKETS_MS,
+            'views': registry.snapshot(),
+            'templates': registry.template_snapshot(),
+            'db_pools': pool_stats(),
+            'caches': cache_stats(),
+        },
+        json_dumps_params={'ensure_ascii': False},
+    )
@@ -0,0 +1,25 @@
+"""Запись больших объемов строк пачками."""
+
+
+def bulk_create_in_batches(model, objects, batch_size, progress=None,
+                           **kwargs):
+    """Записывает объекты из итератора пачками фиксированного размера.
+
+    Одновременно в памяти находится не больше одной пачки.
+    """
+    created = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch, **kwargs)
+            created += len(batch)
+            batch = []
+            if progress is not None:
+                progress(created)
+    if batch:
+        model.objects.bulk_create(batch, **kwargs)
+        created += len(batch)
+        if progress is not None:
+            progress(created)
+    return created
@@ -0,0 +1,356 @@
+"""Нагрузочные замеры страниц posts.
+
+Сценарии гоняются через тестовый клиент Django и через настоящий
+WSGI-сервер (wsgiref в отдельном потоке). Для каждого сценария
+собираются перцентили задержки и число SQL-запросов на запрос.
+"""
+import contextlib
+import math
+import re
+import resource
+import statistics
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.cache import BACKEND as TWO_TIER_BACKEND
+from core.cache import reset_local_tiers
+from core.db.pool import reset_pools
+
+from .models import Group, Post
+
+# Стратегии соединений с базой: CONN_MAX_AGE и бэкенд
+CONNECTION_STRATEGIES = {
+    'connect': {'CONN_MAX_AGE': 0},
+    'persistent': {'CONN_MAX_AGE': 60},
+    'pooled': {'CONN_MAX_AGE': 0, 'POOLED': True},
+}
+
+POOLED_ENGINES = {
+    'sqlite': 'core.db.backends.sqlite3',
+    'postgresql': 'core.db.backends.postgresql',
+}
+
+FEED_SCENARIOS = ('index', 'index_deep', 'group_posts', 'profile')
+
+CACHE_STRATEGIES = ('plain', 'two_tier')
+
+# Локальный уровень для замера, если в CACHES он не настроен
+TWO_TIER_OPTIONS = {
+    'MAX_ENTRIES': 5000,
+    'LOCAL_TIMEOUT': 30,
+    'LOCAL_KEY_PREFIXES': [
+        'posts:group:',
+        'posts:post:',
+        'posts:author_posts_count:',
+        'template.cache.post_card.',
+    ],
+}
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(timings, queries):
+    return {
+        'requests': len(timings),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries_per_request': round(statistics.mean(queries), 2),
+    }
+
+
+def peak_rss_kb():
+    """Пиковый размер резидентной памяти процесса в КБ (Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def build_scenarios(author):
+    """Возвращает сценарии: имя -> (метод, адрес, данные формы)."""
+    post = Post.objects.filter(author=author).first()
+    group = Group.objects.exclude(posts_count=0).first()
+    return {
+        'index': ('GET', reverse('posts:index'), None),
+        'index_deep': (
+            'GET', reverse('posts:index') + '?page=100', None
+        ),
+        'group_posts': (
+            'GET',
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            None,
+        ),
+        'profile': (
+            'GET',
+            reverse('posts:profile', kwargs={'username': author.username}),
+            None,
+        ),
+        'post_detail': (
+            'GET',
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            None,
+        ),
+        'post_create': (
+            'POST',
+            reverse('posts:post_create'),
+            {'text': 'Пост из замера.', 'group': group.pk},
+        ),
+        'post_edit': (
+            'POST',
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Пост изменен замером.', 'group': group.pk},
+        ),
+    }
+
+
+def run_client(scenarios, requests, user=None):
+    """Прогоняет сценарии через django.test.Client."""
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    results = {}
+    for name, (method, address, data) in scenarios.items():
+        if method == 'POST' and user is None:
+            continue
+        timings = []
+        queries = []
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                if method == 'POST':
+                    client.post(address, data)
+                else:
+                    client.get(address)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+        results[name] = summarize(timings, queries)
+    return results
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryCountingApplication:
+    """WSGI-обертка, считающая SQL-запросы каждого обработанного
+    запроса в потоке сервера.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.last_queries = 0
+
+    def __call__(self, environ, start_response):
+        counter = []
+
+        def count(execute, sql, params, many, context):
+            counter.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = self.application(environ, start_response)
+            body = b''.join(response)
+            if hasattr(response, 'close'):
+                response.close()
+        self.last_queries = len(counter)
+        return [body]
+
+
+class BenchServer:
+    """WSGI-сервер проекта в фоновом потоке."""
+
+    def __init__(self):
+        self.application = QueryCountingApplication(get_wsgi_application())
+        self.server = make_server(
+            '127.0.0.1', 0, self.application, handler_class=QuietHandler
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class NoRedirectHandler(HTTPRedirectHandler):
+    """Не ходит по редиректам: замеряется только сам запрос."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+OPENER = build_opener(NoRedirectHandler)
+
+
+def login_cookies(user):
+    """Куки сессии для пользователя, пригодные для HTTP-запросов."""
+    client = Client()
+    client.force_login(user)
+    return {
+        settings.SESSION_COOKIE_NAME:
+            client.cookies[settings.SESSION_COOKIE_NAME].value
+    }
+
+
+def http_request(url, cookies, data=None):
+    headers = {'Cookie': '; '.join(f'{k}={v}' for k, v in cookies.items())}
+    body = None
+    if data is not None:
+        body = urlencode(data).encode()
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        headers['Referer'] = url
+    request = Request(url, data=body, headers=headers)
+    try:
+        response = OPENER.open(request)
+    except HTTPError as error:
+        # Редиректы после POST тоже приходят сюда
+        response = error
+    with response:
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for key, morsel in SimpleCookie(header).items():
+                cookies[key] = morsel.value
+        return response.read().decode()
+
+
+def run_wsgi(scenarios, requests, user=None):
+    """Прогоняет сценарии через настоящий WSGI-сервер по HTTP."""
+    results = {}
+    with BenchServer() as server:
+        cookies = login_cookies(user) if user is not None else {}
+        for name, (method, address, data) in scenarios.items():
+            if method == 'POST' and user is None:
+                continue
+            url = server.url + address
+            timings = []
+            queries = []
+            for _ in range(requests):
+                form = None
+                if method == 'POST':
+                    page = http_request(url, cookies)
+                    form = dict(
+                        data, csrfmiddlewaretoken=CSRF_INPUT.search(
+                            page
+                        ).group(1)
+                    )
+                started = time.perf_counter()
+                http_request(url, cookies, form)
+                timings.append((time.perf_counter() - started) * 1000)
+                queries.append(server.application.last_queries)
+            results[name] = summarize(timings, queries)
+    return results
+
+
+def reset_connection(alias):
+    """Закрывает соединение текущего потока и забывает его обертку,
+    чтобы следующее обращение создало ее по новым настройкам.
+    """
+    connections[alias].close()
+    if hasattr(connections._connections, alias):
+        delattr(connections._connections, alias)
+
+
+@contextlib.contextmanager
+def connection_strategy(name, alias=DEFAULT_DB_ALIAS):
+    """Временно переключает базу на стратегию соединений name.
+
+    Действует на потоки, впервые обратившиеся к базе внутри блока,
+    поэтому WSGI-сервер для замера нужно запускать внутри него.
+    """
+    database = connections.databases[alias]
+    saved = dict(database)
+    strategy = dict(CONNECTION_STRATEGIES[name])
+    if strategy.pop('POOLED', False):
+        strategy['ENGINE'] = POOLED_ENGINES[connections[alias].vendor]
+    database.update(strategy)
+    reset_connection(alias)
+    try:
+        yield
+    finally:
+        database.clear()
+        database.update(saved)
+        reset_connection(alias)
+        reset_pools()
+
+
+@contextlib.contextmanager
+def cache_strategy(name):
+    """Временно переключает кэш по умолчанию: 'plain' - только общий
+    кэш, 'two_tier' - общий кэш с локальным уровнем core.cache.
+    """
+    default = settings.CACHES['default']
+    options = TWO_TIER_OPTIONS
+    if default['BACKEND'] == TWO_TIER_BACKEND:
+        options = default.get('OPTIONS', options)
+        default = settings.CACHES[default['LOCATION']]
+    caches_setting = {'default': default}
+    if name == 'two_tier':
+        caches_setting = {
+            'default': {
+                'BACKEND': TWO_TIER_BACKEND,
+                'LOCATION': 'shared',
+                'OPTIONS': options,
+            },
+            'shared': default,
+        }
+    reset_local_tiers()
+    try:
+        with override_settings(CACHES=caches_setting):
+            yield
+    finally:
+        reset_local_tiers()
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Ищет регрессии относительно сохраненного результата.
+
+    Регрессия: p95 вырос больше чем на tolerance (доля)
+    или выросло число запросов на запрос.
+    """
+    regressions = []
+    for mode, scenarios in results.get('modes', {}).items():
+        for name, current in scenarios.items():
+            previous = baseline.get('modes', {}).get(mode, {}).get(name)
+            if previous is None:
+                continue
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{mode}/{name}: p95 {previous["p95_ms"]} -> '
+                    f'{current["p95_ms"]} мс'
+                )
+            if current['queries_per_request'] > (
+                    previous['queries_per_request']):
+                regressions.append(
+                    f'{mode}/{name}: запросов '
+                    f'{previous["queries_per_request"]} -> '
+                    f'{current["queries_per_request"]}'
+                )
+    return regressions
@@ -0,0 +1,352 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import router
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from core.db.routers import primary_reads
+
+from .counters import get_author_posts_count
+from .models import Group, Post
+
+GROUP_CACHE_TIMEOUT = settings.GROUP_CACHE_TIMEOUT
+
+POST_CACHE_TIMEOUT = settings.POST_CACHE_TIMEOUT
+
+PAGE_CACHE_TIMEOUT = settings.PAGE_CACHE_TIMEOUT
+
+PAGE_STALE_TIMEOUT = settings.PAGE_STALE_TIMEOUT
+
+PAGE_REBUILD_LOCK_TIMEOUT = settings.PAGE_REBUILD_LOCK_TIMEOUT
+
+PAGE_REBUILD_WAIT = settings.PAGE_REBUILD_WAIT
+
+PAGE_REBUILD_POLL_INTERVAL = 0.05
+
+GENERATION_KEY = 'posts:generation'
+
+
+def group_cache_key(slug):
+    return f'posts:group:{slug}'
+
+
+def get_group(slug):
+    """Возвращает группу по slug из кэша, при промахе читает из базы.
+
+    Вместе с группой кэшируется и ее счетчик постов, поэтому
+    при промахе группа читается из основной базы.
+    """
+    key = group_cache_key(slug)
+    group = cache.get(key)
+    if group is None:
+        with primary_reads():
+            group = get_object_or_404(Group, slug=slug)
+        cache.set(key, group, GROUP_CACHE_TIMEOUT)
+    return group
+
+
+def invalidate_group(slug):
+    cache.delete(group_cache_key(slug))
+
+
+def invalidate_group_by_id(group_id):
+    slug = Group.objects.filter(pk=group_id).values_list(
+        'slug', flat=True
+    ).first()
+    if slug is not None:
+        invalidate_group(slug)
+
+
+def invalidate_groups():
+    """Сбрасывает кэш всех групп."""
+    slugs = Group.objects.values_list('slug', flat=True)
+    cache.delete_many([group_cache_key(slug) for slug in slugs])
+
+
+def post_cache_key(post_id):
+    return f'posts:post:{post_id}'
+
+
+def get_post(post_id):
+    """Возвращает пост вместе с автором и группой из кэша,
+    при промахе читает одним запросом.
+
+    Кэш заполняется только из основной базы: строка с отстающей
+    реплики после правки прожила бы в кэше до конца таймаута.
+    Запись сбрасывается при изменении и удалении поста
+    (invalidate_posts), а также при изменении его группы
+    и имени автора.
+    """
+    key = post_cache_key(post_id)
+    post = cache.get(key)
+    if post is None:
+        post = get_object_or_404(
+            Post.objects.for_feed().using(router.db_for_write(Post)),
+            pk=post_id,
+        )
+        cache.set(key, post, POST_CACHE_TIMEOUT)
+    return post
+
+
+def invalidate_posts(post_ids):
+    cache.delete_many([post_cache_key(post_id) for post_id in post_ids])
+
+
+def get_cached_author_posts_count(author):
+    """Количество постов автора из кэша.
+
+    Ключ включает поколение контента: новый или удаленный пост
+    автора переводит ленты на новое поколение и заодно сбрасывает
+    закэшированный счетчик. Счетчик читается из основной базы.
+    """
+    key = f'posts:author_posts_count:{get_generation()}:{author.pk}'
+    count = cache.get(key)
+    if count is None:
+        with primary_reads():
+            count = get_author_posts_count(author)
+        cache.set(key, count, POST_CACHE_TIMEOUT)
+    return count
+
+
+def post_card_cache_key(post):
+    """Ключ фрагмента posts/includes/post_card.html для поста.
+
+    Ключ меняется вместе с updated_at, именем автора и группой,
+    поэтому карточка сразу обновляется после правки поста,
+    переименования группы или смены имени автора.
+    """
+    group = post.group
+    return make_template_fragment_key('post_card', [
+        post.pk,
+        post.updated_at.timestamp(),
+        post.author.username,
+        post.author.get_full_name(),
+        group.slug if group else '',
+        group.title if group else '',
+    ])
+
+
+def get_generation():
+    """Текущее поколение контента лент."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 1, None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def bump_generation():
+    """Переводит ленты на новое поколение: старые страницы
+    в кэше больше не читаются и вытесняются сами.
+    """
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, None)
+        return get_generation()
+
+
+def page_path_hash(request):
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def page_cache_key(request):
+    return f'posts:page:{get_generation()}:{page_path_hash(request)}'
+
+
+def stale_page_cache_key(request):
+    """Ключ последней собранной версии страницы без поколения:
+    ее отдают, пока другой запрос собирает свежую.
+    """
+    return f'posts:page:stale:{page_path_hash(request)}'
+
+
+def stale_etag(generation):
+    """ETag прошлой версии страницы: не совпадает ни с одним ETag,
+    посчитанным по данным, поэтому браузер не закрепит старое тело.
+    """
+    return f'"stale-{generation}"'
+
+
+def cached_response(cached):
+    content, content_type = cached[:2]
+    return HttpResponse(content, content_type=content_type)
+
+
+def wait_for_page(key, lock_key):
+    """Ждет, пока другой запрос положит страницу в кэш.
+
+    Если блокировка снята, а страницы нет (собиравший получил
+    не 200 или упал), ждать дальше нечего.
+    """
+    deadline = time.monotonic() + PAGE_REBUILD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(PAGE_REBUILD_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        if cache.get(lock_key) is None:
+            # Страница кладется в кэш до снятия блокировки
+            return cache.get(key)
+    return None
+
+
+def build_page(view, request, key, *args, **kwargs):
+    """Собирает страницу и кладет ее в кэш вместе с копией
+    для stale-while-revalidate.
+
+    Страница собирается по основной базе: собранная с отстающей
+    реплики, она досталась бы всем анонимам до смены поколения.
+    """
+    generation = get_generation()
+    with primary_reads():
+        response = view(request, *args, **kwargs)
+    if response.status_code == 200 and not response.streaming:
+        cached = (response.content, response['Content-Type'])
+        cache.set(key, cached, PAGE_CACHE_TIMEOUT)
+        cache.set(
+            stale_page_cache_key(request),
+            cached + (generation,),
+            PAGE_STALE_TIMEOUT,
+        )
+    return response
+
+
+def render_page_once(view, request, key, *args, **kwargs):
+    """Пересборка страницы при промахе кэша без «стада».
+
+    Собирает страницу только запрос, получивший блокировку
+    (cache.add атомарен, поэтому блокировка общая для потоков
+    и для воркеров с общим кэшем). Остальные сразу получают
+    прошлую версию страницы, а если ее нет - ждут, пока свежая
+    появится в кэше или блокировка будет снята. Не дождавшись,
+    собирают страницу сами.
+    """
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, PAGE_REBUILD_LOCK_TIMEOUT):
+        try:
+            return build_page(view, request, key, *args, **kwargs)
+        finally:
+            cache.delete(lock_key)
+    stale = cache.get(stale_page_cache_key(request))
+    if stale is not None:
+        response = cached_response(stale)
+        # Условный GET не должен закрепить старую версию в браузере
+        response['ETag'] = stale_etag(stale[2])
+        response.is_stale = True
+        return response
+    cached = wait_for_page(key, lock_key)
+    if cached is not None:
+        return cached_response(cached)
+    return view(request, *args, **kwargs)
+
+
+def cache_page_for_anonymous(view):
+    """Кэширует страницу для анонимных пользователей.
+
+    Ключ включает поколение контента, поэтому новая или измененная
+    запись сразу видна без ожидания истечения кэша. Авторизованные
+    пользователи видят другую шапку и идут мимо кэша. Промах кэша
+    обрабатывает render_page_once.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            response = cached_response(cached)
+        else:
+            response = render_page_once(view, request, key, *args, **kwargs)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def posts_stamp(posts):
+    """Время последнего изменения и число постов выборки.
+
+    Число нужно, чтобы заметить удаление: оно не меняет максимум
+    updated_at. Читается из основной базы, как и остальные
+    заполнения кэша.
+    """
+    stamp = posts.using(router.db_for_write(Post)).aggregate(
+        last_modified=Max('updated_at'), count=Count('pk')
+    )
+    return stamp['last_modified'], stamp['count']
+
+
+def posts_last_modified(posts):
+    """Время последнего изменения выборки, без подсчета постов:
+    там, где число уже есть в поддерживаемом счетчике.
+    """
+    return posts.using(router.db_for_write(Post)).aggregate(
+        last_modified=Max('updated_at')
+    )['last_modified']
+
+
+def cached_stamp(scope, compute):
+    """Отметка изменения выборки scope, посчитанная compute() по данным.
+
+    Хранится в кэше в пределах поколения: после изменения постов
+    она считается заново, а после сброса кэша получается та же
+    отметка для тех же данных.
+    """
+    key = f'posts:stamp:{get_generation()}:{scope}'
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = compute()
+        cache.set(key, stamp, PAGE_CACHE_TIMEOUT)
+    return stamp
+
+
+def conditional_page(stamp_func):
+    """Условный GET по данным страницы.
+
+    stamp_func(request, *args, **kwargs) возвращает пару (время
+    последнего изменения, версия), где версия - строка с остальными
+    влияющими на страницу данными. ETag строится из них и пользователя,
+    Last-Modified - время изменения. Отметка считается один раз
+    на запрос. Прошлой версии страницы из render_page_once
+    Last-Modified не ставится: текущее время изменения к ней
+    не относится.
+    """
+    def stamp(request, *args, **kwargs):
+        if not hasattr(request, '_content_stamp'):
+            request._content_stamp = stamp_func(request, *args, **kwargs)
+        return request._content_stamp
+
+    def etag(request, *args, **kwargs):
+        last_modified, version = stamp(request, *args, **kwargs)
+        user_key = request.user.pk if request.user.is_authenticated else 0
+        moment = last_modified.isoformat() if last_modified else ''
+        raw = f'{moment}|{version}|{user_key}'
+        return '"' + hashlib.md5(raw.encode()).hexdigest() + '"'
+
+    def last_modified(request, *args, **kwargs):
+        return stamp(request, *args, **kwargs)[0]
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if getattr(response, 'is_stale', False):
+                del response['Last-Modified']
+            return response
+        return wrapper
+
+    return decorator
@@ -0,0 +1,89 @@
+from django.db.models import Count, F
+
+from .models import AuthorPostCounter, Group, Post, User
+
+
+def change_author_posts_count(author_id, delta):
+    """Атомарно изменяет счетчик постов автора на delta.
+
+    Если счетчика еще нет, при увеличении он создается по фактическому
+    количеству постов автора, а при уменьшении остается отсутствующим
+    до первого чтения.
+    """
+    updated = AuthorPostCounter.objects.filter(author_id=author_id).update(
+        posts_count=F('posts_count') + delta
+    )
+    if not updated and delta > 0:
+        reconcile_author_counter(author_id)
+
+
+def change_group_posts_count(group_id, delta):
+    """Атомарно изменяет счетчик постов группы на delta."""
+    Group.objects.filter(pk=group_id).update(
+        posts_count=F('posts_count') + delta
+    )
+
+
+def reconcile_author_counter(author_id):
+    """Пересчитывает счетчик постов одного автора."""
+    counter, _ = AuthorPostCounter.objects.update_or_create(
+        author_id=author_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count()
+        },
+    )
+    return counter
+
+
+def get_author_posts_count(author):
+    """Возвращает количество постов автора из счетчика."""
+    try:
+        return author.post_counter.posts_count
+    except AuthorPostCounter.DoesNotExist:
+        return reconcile_author_counter(author.pk).posts_count
+
+
+def reconcile_author_counters(batch_size=1000):
+    """Сверяет счетчики всех авторов с фактическим числом постов.
+
+    Возвращает количество исправленных счетчиков.
+    """
+    stored = dict(
+        AuthorPostCounter.objects.values_list('author_id', 'posts_count')
+    )
+    actual = User.objects.annotate(
+        actual_count=Count('posts')
+    ).values_list('pk', 'actual_count')
+    missing = []
+    drifted = []
+    for author_id, actual_count in actual.iterator():
+        if author_id not in stored:
+            missing.append(AuthorPostCounter(
+                author_id=author_id, posts_count=actual_count
+            ))
+        elif stored[author_id] != actual_count:
+            drifted.append(AuthorPostCounter(
+                author_id=author_id, posts_count=actual_count
+            ))
+    AuthorPostCounter.objects.bulk_create(missing, batch_size=batch_size)
+    AuthorPostCounter.objects.bulk_update(
+        drifted, ['posts_count'], batch_size=batch_size
+    )
+    return len(missing) + len(drifted)
+
+
+def reconcile_group_counters(batch_size=1000):
+    """Сверяет счетчики всех групп с фактическим числом постов.
+
+    Возвращает количество исправленных счетчиков.
+    """
+    groups = Group.objects.annotate(actual_count=Count('posts'))
+    drifted = []
+    for group in groups.iterator():
+        if group.posts_count != group.actual_count:
+            group.posts_count = group.actual_count
+            drifted.append(group)
+    Group.objects.bulk_update(
+        drifted, ['posts_count'], batch_size=batch_size
+    )
+    return len(drifted)
@@ -0,0 +1,162 @@
+"""Потоковая выгрузка постов в JSONL и CSV.
+
+Посты читаются пачками по первичному ключу (id > последний
+выгруженный), поэтому каждый запрос к базе дешевый, а в памяти
+находится не больше одной пачки. Сжатие gzip выполняется на лету.
+"""
+import csv
+import datetime
+import io
+import json
+import zlib
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Post
+
+EXPORT_FIELDS = (
+    'id', 'text', 'pub_date', 'updated_at',
+    'author__username', 'group__slug', 'group__title',
+)
+
+# Имена колонок в выгрузке, совпадают с форматом import_posts
+EXPORT_COLUMNS = (
+    'id', 'text', 'pub_date', 'updated_at', 'author', 'group', 'group_title',
+)
+
+EXPORT_FORMATS = ('jsonl', 'csv')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CHUNK_SIZE = 2000
+
+
+def parse_bound(value, end=False):
+    """Превращает дату или дату со временем в aware datetime.
+
+    Для конца интервала дата без времени включает весь день.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'неверная дата {value!r}')
+        if end:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_posts(queryset, group=None, author=None, since=None,
+                 until=None):
+    """Применяет фильтры выгрузки: slug группы, username автора
+    и интервал pub_date (since включительно, until не включительно
+    для дат со временем).
+    """
+    if group:
+        queryset = queryset.filter(group__slug=group)
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if since:
+        queryset = queryset.filter(pub_date__gte=parse_bound(since))
+    if until:
+        queryset = queryset.filter(pub_date__lt=parse_bound(until, end=True))
+    return queryset
+
+
+def export_rows(queryset=None, chunk_size=CHUNK_SIZE):
+    """Выдает посты словарями в порядке id, пачками по chunk_size.
+
+    Вместо OFFSET каждая пачка начинается после последнего id
+    предыдущей, поэтому стоимость запроса не растет к концу выгрузки.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    queryset = queryset.order_by('id').values_list(*EXPORT_FIELDS)
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        for values in chunk:
+            yield dict(zip(EXPORT_COLUMNS, values))
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1][0]
+
+
+def serialize_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def to_jsonl(rows):
+    for row in rows:
+        row = {key: serialize_value(value) for key, value in row.items()}
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(
+            {key: serialize_value(value) for key, value in row.items()}
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+SERIALIZERS = {
+    'jsonl': to_jsonl,
+    'csv': to_csv,
+}
+
+
+def encode_lines(lines, buffer_size=64 * 1024):
+    """Кодирует строки в UTF-8 и склеивает их в блоки около
+    buffer_size байт, чтобы не отдавать клиенту по строчке.
+    """
+    block = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        block.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            yield b''.join(block)
+            block = []
+            size = 0
+    if block:
+        yield b''.join(block)
+
+
+def gzip_stream(blocks):
+    """Сжимает поток байтов в формат gzip на лету."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_posts(file_format, queryset=None, compress=False,
+                 chunk_size=CHUNK_SIZE):
+    """Возвращает итератор блоков байтов с выгрузкой постов."""
+    if file_format not in SERIALIZERS:
+        raise ValueError(f'неизвестный формат {file_format!r}')
+    blocks = encode_lines(
+        SERIALIZERS[file_format](export_rows(queryset, chunk_size))
+    )
+    if compress:
+        blocks = gzip_stream(blocks)
+    return blocks
@@ -0,0 +1,9 @@
+"""Единая точка оповещения об изменении постов.
+
+Слои кэширования подписываются на posts_changed и получают id
+измененных постов, откуда бы ни пришло изменение: save() из форм
+и админки, delete() или массовый QuerySet.update().
+"""
+from django.dispatch import Signal
+
+posts_changed = Signal(providing_args=['post_ids'])
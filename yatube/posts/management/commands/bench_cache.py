@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import cache_stats
+from posts.benchmark import (CACHE_STRATEGIES, FEED_SCENARIOS,
+                             build_scenarios, cache_strategy, run_wsgi)
+from posts.models import Post, User
+from posts.seed import seed_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку лент и страницы поста с общим кэшем '
+        'и с локальным уровнем core.cache перед ним. Разница видна, '
+        'когда общий кэш сетевой (memcached из yatube.settings.prod).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Сколько постов создать перед замером.',
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument(
+            '--strategy',
+            action='append',
+            choices=CACHE_STRATEGIES,
+            help='Вариант кэша для замера, можно несколько; по умолчанию '
+                 'все.',
+        )
+        parser.add_argument(
+            '--anonymous',
+            action='store_true',
+            help='GET-запросы от анонимного пользователя (через кэш '
+                 'страниц).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для JSON-результата, по умолчанию stdout.',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed_posts(options['seed'], options['users'], options['groups'])
+        post = Post.objects.exclude(group=None).first()
+        if post is None:
+            raise CommandError('В базе нет постов, используйте --seed.')
+        author = User.objects.get(pk=post.author_id)
+        scenarios = {
+            name: scenario
+            for name, scenario in build_scenarios(author).items()
+            if name in FEED_SCENARIOS + ('post_detail',)
+        }
+        reader = None if options['anonymous'] else author
+        results = {
+            'requests': options['requests'],
+            'posts': Post.objects.count(),
+            'anonymous': options['anonymous'],
+            'strategies': {},
+        }
+        for name in options['strategy'] or CACHE_STRATEGIES:
+            with cache_strategy(name):
+                strategy_results = run_wsgi(
+                    scenarios, options['requests'], reader
+                )
+                strategy_results['caches'] = cache_stats()
+            results['strategies'][name] = strategy_results
+        data = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(data)
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,105 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from posts.models import Post
+from posts.seed import seed_posts
+
+PAGE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы и время запросов лент без индексов '
+        'и с индексами из posts.Post.Meta.indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Сколько постов создать перед замером (например 1000000).',
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз выполнить каждый запрос.',
+        )
+        parser.add_argument(
+            '--deep-page',
+            type=int,
+            default=1000,
+            help='Номер «глубокой» страницы главной ленты.',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed_posts(
+                options['seed'],
+                options['users'],
+                options['groups'],
+                progress=self.report_progress,
+            )
+        queries = self.feed_queries(options['deep_page'])
+        if not queries:
+            self.stderr.write('В базе нет постов, используйте --seed.')
+            return
+        with transaction.atomic():
+            self.drop_feed_indexes()
+            before = self.measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+        after = self.measure(queries, options['repeat'])
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (('без индексов', before),
+                                   ('с индексами', after)):
+                plan, median = results[name]
+                self.stdout.write(f'  {label}: {median:.2f} мс')
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+    def report_progress(self, created):
+        self.stdout.write(f'Создано постов: {created}')
+
+    def feed_queries(self, deep_page):
+        post = Post.objects.order_by().values(
+            'author_id', 'group_id'
+        ).exclude(group=None).first()
+        if post is None:
+            return {}
+        feed = Post.objects.for_feed()
+        offset = (deep_page - 1) * PAGE_SIZE
+        return {
+            'index, стр. 1': feed[:PAGE_SIZE],
+            f'index, стр. {deep_page}': feed[offset:offset + PAGE_SIZE],
+            'profile, стр. 1': feed.filter(
+                author_id=post['author_id']
+            )[:PAGE_SIZE],
+            'group_list, стр. 1': feed.filter(
+                group_id=post['group_id']
+            )[:PAGE_SIZE],
+        }
+
+    def drop_feed_indexes(self):
+        with connection.cursor() as cursor:
+            for index in Post._meta.indexes:
+                cursor.execute(
+                    f'DROP INDEX {connection.ops.quote_name(index.name)}'
+                )
+
+    def measure(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (queryset.explain(), statistics.median(timings))
+        return results
@@ -0,0 +1,113 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import (build_scenarios, compare_with_baseline,
+                             peak_rss_kb, run_client, run_wsgi)
+from posts.models import Post, User
+from posts.seed import seed_posts
+
+MODES = {
+    'client': run_client,
+    'wsgi': run_wsgi,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число SQL-запросов и память на страницах '
+        'posts. Запускайте на отдельной базе: сценарии создают посты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Сколько постов создать перед замером.',
+        )
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Сколько запросов выполнить в каждом сценарии.',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=tuple(MODES) + ('both',),
+            default='both',
+        )
+        parser.add_argument(
+            '--anonymous',
+            action='store_true',
+            help='GET-запросы от анонимного пользователя (через кэш).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для JSON-результата, по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона: при регрессии команда упадет.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Допустимый рост p95 относительно baseline (доля).',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed_posts(options['seed'], options['users'], options['groups'])
+        post = Post.objects.exclude(group=None).first()
+        if post is None:
+            raise CommandError('В базе нет постов, используйте --seed.')
+        author = User.objects.get(pk=post.author_id)
+        scenarios = build_scenarios(author)
+        modes = MODES if options['mode'] == 'both' else {
+            options['mode']: MODES[options['mode']]
+        }
+        results = {
+            'requests': options['requests'],
+            'posts': Post.objects.count(),
+            'anonymous': options['anonymous'],
+            'modes': {},
+        }
+        for mode, run in modes.items():
+            get_scenarios = {
+                name: scenario for name, scenario in scenarios.items()
+                if scenario[0] == 'GET'
+            }
+            post_scenarios = {
+                name: scenario for name, scenario in scenarios.items()
+                if scenario[0] == 'POST'
+            }
+            reader = None if options['anonymous'] else author
+            mode_results = run(get_scenarios, options['requests'], reader)
+            mode_results.update(
+                run(post_scenarios, options['requests'], author)
+            )
+            results['modes'][mode] = mode_results
+        results['peak_rss_kb'] = peak_rss_kb()
+        self.write_results(results, options['output'])
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare_with_baseline(
+                results, baseline, options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессия производительности:\n' + '\n'.join(regressions)
+                )
+
+    def write_results(self, results, output):
+        data = json.dumps(results, ensure_ascii=False, indent=2)
+        if output:
+            with open(output, 'w') as output_file:
+                output_file.write(data)
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,63 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (CHUNK_SIZE, EXPORT_FORMATS, export_posts,
+                          filter_posts)
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты с авторами и группами в JSONL/CSV. '
+        'Память не зависит от объема выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            default='-',
+            help='Файл для выгрузки; по умолчанию стандартный вывод.',
+        )
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='jsonl'
+        )
+        parser.add_argument('--group', help='slug группы.')
+        parser.add_argument('--author', help='username автора.')
+        parser.add_argument(
+            '--since', help='Начало интервала pub_date (ISO 8601).'
+        )
+        parser.add_argument(
+            '--until', help='Конец интервала pub_date (ISO 8601).'
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            posts = filter_posts(
+                Post.objects.all(),
+                group=options['group'],
+                author=options['author'],
+                since=options['since'],
+                until=options['until'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        blocks = export_posts(
+            options['format'],
+            posts,
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output'] == '-':
+            self.write_blocks(blocks, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write_blocks(blocks, output)
+
+    def write_blocks(self, blocks, output):
+        for block in blocks:
+            output.write(block)
+        output.flush()
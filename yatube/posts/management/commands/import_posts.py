@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.search import install_search_index, uninstall_search_index
+from posts.seed import (generate_posts, import_posts, read_csv, read_jsonl,
+                        relaxed_durability, rows_to_posts, seed_groups,
+                        seed_users)
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает посты из JSONL/CSV или создает синтетические '
+        'пачками через bulk_create. Память не зависит от объема данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            nargs='?',
+            help='Файл JSONL/CSV с полями text, author, group, pub_date; '
+                 '"-" - стандартный ввод.',
+        )
+        parser.add_argument('--format', choices=tuple(READERS))
+        parser.add_argument(
+            '--synthesize',
+            type=int,
+            default=0,
+            help='Создать столько синтетических постов вместо файла.',
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Создавать неизвестных авторов и группы.',
+        )
+        parser.add_argument(
+            '--defer-search-index',
+            action='store_true',
+            help='Отключить поисковый индекс на время загрузки '
+                 'и перестроить его один раз в конце.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['source'] and not options['synthesize']:
+            raise CommandError('Укажите файл или --synthesize N.')
+        connection = connections[DEFAULT_DB_ALIAS]
+        self.started = time.perf_counter()
+        if options['defer_search_index']:
+            uninstall_search_index(connection)
+        try:
+            with relaxed_durability(connection):
+                created = self.load(options)
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if options['defer_search_index']:
+                self.stdout.write('Перестраиваем поисковый индекс...')
+                install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {created} '
+            f'за {time.perf_counter() - self.started:.1f} с'
+        ))
+
+    def load(self, options):
+        batch_size = options['batch_size']
+        if options['synthesize']:
+            author_ids = seed_users(options['users'])
+            group_ids = seed_groups(options['groups'])
+            posts = generate_posts(
+                options['synthesize'], author_ids, group_ids
+            )
+            return import_posts(posts, batch_size, self.report_progress)
+        source = options['source']
+        file_format = options['format'] or os.path.splitext(
+            source
+        )[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(
+                'Не удалось определить формат, укажите --format.'
+            )
+        if source == '-':
+            return self.load_file(sys.stdin, file_format, options)
+        with open(source, newline='', encoding='utf-8') as source_file:
+            return self.load_file(source_file, file_format, options)
+
+    def load_file(self, source_file, file_format, options):
+        rows = READERS[file_format](source_file)
+        posts = rows_to_posts(rows, options['create_missing'])
+        return import_posts(
+            posts, options['batch_size'], self.report_progress
+        )
+
+    def report_progress(self, created):
+        elapsed = time.perf_counter() - self.started
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(f'Загружено {created} постов, {rate:.0f} в секунду')
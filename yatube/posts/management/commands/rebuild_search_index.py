@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.search import install_search_index, uninstall_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересоздает полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        uninstall_search_index(connection)
+        install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересоздан.'))
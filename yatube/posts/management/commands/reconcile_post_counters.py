@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import invalidate_groups
+from posts.counters import reconcile_author_counters, reconcile_group_counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счетчики постов с базой.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при записи счетчиков.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed_authors = reconcile_author_counters(batch_size=batch_size)
+        fixed_groups = reconcile_group_counters(batch_size=batch_size)
+        if fixed_groups:
+            invalidate_groups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков авторов: {fixed_authors}, '
+            f'групп: {fixed_groups}'
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-17 03:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_author_post_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorPostCounter = apps.get_model('posts', 'AuthorPostCounter')
+    counts = User.objects.annotate(
+        posts_count=models.Count('posts')
+    ).values_list('pk', 'posts_count')
+    AuthorPostCounter.objects.bulk_create(
+        (AuthorPostCounter(author_id=pk, posts_count=posts_count)
+         for pk, posts_count in counts.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0003_baseline_model_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorPostCounter',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+            ],
+        ),
+        migrations.RunPython(
+            fill_author_post_counters, migrations.RunPython.noop
+        ),
+    ]
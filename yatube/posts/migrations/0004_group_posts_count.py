@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-17 03:53
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_group_post_counters(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Group.objects.update(
+        posts_count=Coalesce(
+            models.Subquery(
+                Post.objects.filter(
+                    group=models.OuterRef('pk')
+                ).order_by().values('group').annotate(
+                    count=models.Count('pk')
+                ).values('count')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_authorpostcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.RunPython(
+            fill_group_post_counters, migrations.RunPython.noop
+        ),
+    ]
@@ -1,9 +1,30 @@
+from itertools import islice
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
+
+from .invalidation import posts_changed
 
 NUMBER_OF_CHARACTERS_FOR_MODELS = settings.NUMBER_OF_CHARACTERS_FOR_MODELS
 
+POSTS_CHANGED_BATCH_SIZE = settings.POSTS_CHANGED_BATCH_SIZE
+
+# Поля, которые выводятся в карточке поста в лентах
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'updated_at',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
 User = get_user_model()
 
 
@@ -11,11 +32,51 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов'
+    )
 
     def __str__(self):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним запросом,
+        без неиспользуемых в карточке колонок.
+        """
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def update(self, **kwargs):
+        """Массовое обновление с отметкой времени изменения
+        и оповещением слоев кэширования.
+
+        Измененные посты находятся уже после обновления по новому
+        updated_at и передаются в posts_changed пачками по
+        POSTS_CHANGED_BATCH_SIZE, поэтому их id не собираются
+        в память все сразу. Посты, сохраненные в тот же момент,
+        тоже попадут в оповещение - лишний сброс кэша безопасен.
+        """
+        updated_at = kwargs.setdefault('updated_at', timezone.now())
+        rows = super().update(**kwargs)
+        if rows:
+            post_ids = self.model._base_manager.using(self.db).filter(
+                updated_at=updated_at
+            ).values_list('pk', flat=True).order_by().iterator(
+                chunk_size=POSTS_CHANGED_BATCH_SIZE
+            )
+            while True:
+                batch = list(islice(post_ids, POSTS_CHANGED_BATCH_SIZE))
+                if not batch:
+                    break
+                posts_changed.send(sender=self.model, post_ids=batch)
+        return rows
+
+    update.alters_data = True
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -25,6 +86,11 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -41,8 +107,124 @@ class Post(models.Model):
         help_text='Группа, к которой будет относиться пост'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # Индексы повторяют сортировку и фильтры лент
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:NUMBER_OF_CHARACTERS_FOR_MODELS]
+
+
+class AuthorPostCounter(models.Model):
+    """Денормализованный счетчик постов автора."""
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='post_counter',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя.
+
+    Дата публикации и автор продублированы из поста, чтобы лента
+    читалась одним проходом по индексу (user, -pub_date, -id).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        db_index=False,
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='timeline_user_pub_date_idx'
+            ),
+            # Для удаления постов автора из ленты при отписке
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
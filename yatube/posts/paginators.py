@@ -0,0 +1,279 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.db.statistics import estimate_table_rows
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction, post):
+    """Упаковывает позицию поста в ленте в непрозрачный токен."""
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    token = base64.urlsafe_b64encode(raw.encode())
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора.
+
+    Возвращает кортеж (направление, дата публикации, pk) или None,
+    если токен пустой или поврежден.
+    """
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class FeedPage(Page):
+    # Есть ли записи после страницы; известно только при оценке count
+    has_more = False
+
+    def has_next(self):
+        if self.paginator.count_is_estimate:
+            return self.has_more
+        return super().has_next()
+
+    @property
+    def elided_page_range(self):
+        """Номера страниц для вывода в шаблоне, см.
+        FeedPaginator.get_elided_page_range.
+        """
+        return self.paginator.get_elided_page_range(self.number)
+
+
+class FeedPaginator(Paginator):
+    """Paginator, которому можно передать заранее известное
+    количество записей, чтобы не выполнять COUNT(*). Переданная
+    оценка отмечается count_is_estimate.
+
+    Если задан estimate_threshold, для неотфильтрованной таблицы
+    количество берется из статистики планировщика, когда оно не меньше
+    порога (count_is_estimate становится True). Ниже порога и для
+    отфильтрованных выборок считается точно.
+
+    Умеет выдавать сокращенный список номеров страниц: длина списка
+    не зависит от общего числа страниц.
+    """
+
+    ELLIPSIS = '…'
+
+    # Сколько страниц показывать вокруг текущей и у краев списка
+    ON_EACH_SIDE = 3
+    ON_ENDS = 2
+
+    count_is_estimate = False
+
+    def __init__(self, object_list, per_page, count=None,
+                 count_is_estimate=False, estimate_threshold=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.estimate_threshold = estimate_threshold
+        if count is not None:
+            self.count = count
+            self.count_is_estimate = count_is_estimate
+
+    @cached_property
+    def count(self):
+        if self.estimate_threshold is not None:
+            estimate = self._estimate_count()
+            if estimate is not None and estimate >= self.estimate_threshold:
+                self.count_is_estimate = True
+                return estimate
+        return super().count
+
+    def validate_number(self, number):
+        """При оценке count разрешает номера дальше оценки: статистика
+        могла устареть, и такие страницы проверяются по самим данным.
+        """
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.count_is_estimate or int(number) < 1:
+                raise
+            return int(number)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Номер дальше оценки, но и данных там нет
+            return self.page(self.num_pages)
+
+    def page(self, number):
+        # Обращение к count выясняет, оценка ли это
+        if not self.count or not self.count_is_estimate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        # Лишняя запись показывает, есть ли следующая страница
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > self.num_pages:
+            raise EmptyPage('That page contains no results')
+        page = self._get_page(objects[:self.per_page], number, self)
+        page.has_more = len(objects) > self.per_page
+        # Реальных записей больше оценки: поднимаем ее до известного
+        # минимума, чтобы номера страниц не заканчивались раньше данных
+        known = bottom + len(objects)
+        if known > self.count:
+            self.count = known
+            self.__dict__.pop('num_pages', None)
+        return page
+
+    def _estimate_count(self):
+        """Оценка по статистике таблицы, если выборка - вся таблица."""
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return None
+        query = queryset.query
+        if (query.where or query.distinct or query.combinator
+                or not query.can_filter()):
+            return None
+        return estimate_table_rows(
+            connections[queryset.db], queryset.model._meta.db_table
+        )
+
+    def _get_page(self, *args, **kwargs):
+        return FeedPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1, on_each_side=None,
+                              on_ends=None):
+        """Возвращает номера страниц: первые on_ends, on_each_side
+        вокруг текущей и последние on_ends. Пропуски заменяются
+        на ELLIPSIS.
+        """
+        on_each_side = self.ON_EACH_SIDE if on_each_side is None else (
+            on_each_side
+        )
+        on_ends = self.ON_ENDS if on_ends is None else on_ends
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+
+class CursorPage(Sequence):
+    """Страница ленты, полученная по курсору."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (pub_date, id).
+
+    В отличие от Paginator не считает общее количество записей
+    и не использует OFFSET, поэтому время выборки не зависит
+    от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, cursor):
+        """Возвращает страницу по токену курсора.
+
+        Пустой или некорректный токен дает первую страницу.
+        """
+        position = decode_cursor(cursor)
+        if position is None:
+            return self._first_page()
+        direction, pub_date, pk = position
+        if direction == CURSOR_PREVIOUS:
+            return self._page_before(pub_date, pk)
+        return self._page_after(pub_date, pk)
+
+    def _first_page(self):
+        posts = self._slice(
+            self.object_list.order_by('-pub_date', '-pk')
+        )
+        has_next = len(posts) > self.per_page
+        return self._make_page(posts[:self.per_page], has_next, False)
+
+    def _page_after(self, pub_date, pk):
+        posts = self._slice(
+            self.object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            ).order_by('-pub_date', '-pk')
+        )
+        has_next = len(posts) > self.per_page
+        return self._make_page(posts[:self.per_page], has_next, True)
+
+    def _page_before(self, pub_date, pk):
+        posts = self._slice(
+            self.object_list.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).order_by('pub_date', 'pk')
+        )
+        if not posts:
+            return self._first_page()
+        has_previous = len(posts) > self.per_page
+        posts = posts[:self.per_page][::-1]
+        return self._make_page(posts, True, has_previous)
+
+    def _slice(self, queryset):
+        # Берем на одну запись больше, чтобы узнать о следующей странице
+        return list(queryset[:self.per_page + 1])
+
+    def _make_page(self, posts, has_next, has_previous):
+        next_cursor = None
+        previous_cursor = None
+        if posts and has_next:
+            next_cursor = encode_cursor(CURSOR_NEXT, posts[-1])
+        if posts and has_previous:
+            previous_cursor = encode_cursor(CURSOR_PREVIOUS, posts[0])
+        return CursorPage(posts, self, next_cursor, previous_cursor)
@@ -0,0 +1,150 @@
+"""Полнотекстовый поиск по Post.text.
+
+SQLite: внешняя FTS5-таблица posts_post_fts, которую синхронизируют
+триггеры на posts_post, поэтому индекс обновляется при любой записи,
+включая bulk_create и QuerySet.update().
+PostgreSQL: GIN-индекс по выражению to_tsvector.
+Для остальных баз остается icontains.
+
+Пересоздание таблицы posts_post миграциями SQLite удаляет триггеры,
+после таких миграций нужно выполнить manage.py rebuild_search_index.
+"""
+import re
+
+from django.db import connections
+
+POST_TABLE = 'posts_post'
+
+FTS_TABLE = 'posts_post_fts'
+
+PG_INDEX = 'posts_post_text_fts_idx'
+
+PG_CONFIG = 'russian'
+
+PG_VECTOR = f"to_tsvector('{PG_CONFIG}', {POST_TABLE}.text)"
+
+PG_QUERY = f"plainto_tsquery('{PG_CONFIG}', %s)"
+
+SQLITE_TRIGGERS = (f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au')
+
+SQLITE_INSTALL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"text, content='{POST_TABLE}', content_rowid='id', "
+    f"tokenize='unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    f"AFTER INSERT ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    f"AFTER DELETE ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    f"AFTER UPDATE OF text ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+SQLITE_UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+PG_INSTALL = (
+    f'CREATE INDEX IF NOT EXISTS {PG_INDEX} '
+    f'ON {POST_TABLE} USING GIN ({PG_VECTOR})',
+)
+
+PG_UNINSTALL = (
+    f'DROP INDEX IF EXISTS {PG_INDEX}',
+)
+
+
+def install_search_index(connection):
+    """Создает поисковый индекс и заполняет его текущими постами."""
+    statements = {
+        'sqlite': SQLITE_INSTALL,
+        'postgresql': PG_INSTALL,
+    }.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def uninstall_search_index(connection):
+    statements = {
+        'sqlite': SQLITE_UNINSTALL,
+        'postgresql': PG_UNINSTALL,
+    }.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def missing_search_triggers(connection):
+    """Триггеры FTS, которых нет в базе SQLite.
+
+    Пустой список для других баз и для базы без таблицы постов
+    (миграции еще не применены).
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE type = 'trigger' OR (type = 'table' AND name = %s)",
+            [POST_TABLE],
+        )
+        names = {(kind, name) for kind, name in cursor.fetchall()}
+    if ('table', POST_TABLE) not in names:
+        return []
+    return [
+        trigger for trigger in SQLITE_TRIGGERS
+        if ('trigger', trigger) not in names
+    ]
+
+
+def fts5_query(query):
+    """Переводит пользовательский запрос в безопасный запрос FTS5.
+
+    Каждое слово ищется как префикс, слова объединяются через И.
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_posts(queryset, query):
+    """Фильтрует посты по запросу и сортирует по релевантности.
+
+    Поле search_rank: чем больше, тем релевантнее.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            return queryset.none()
+        # Соединение, а не id IN (подзапрос): SQLite неверно выполняет
+        # коррелированный bm25() вместе с IN по той же FTS-таблице
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = {POST_TABLE}.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+        ).order_by('-search_rank', '-pub_date', '-id')
+    if connection.vendor == 'postgresql':
+        return queryset.extra(
+            select={'search_rank': f'ts_rank({PG_VECTOR}, {PG_QUERY})'},
+            select_params=[query],
+            where=[f'{PG_VECTOR} @@ {PG_QUERY}'],
+            params=[query],
+        ).order_by('-search_rank', '-pub_date', '-id')
+    return queryset.filter(text__icontains=query)
@@ -0,0 +1,260 @@
+import contextlib
+import csv
+import json
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.db.statistics import analyze_tables
+
+from .batches import bulk_create_in_batches
+from .cache import bump_generation, invalidate_groups
+from .counters import reconcile_author_counters, reconcile_group_counters
+from .models import Group, Post, User
+from .timeline import fan_out_authors
+
+WORDS = (
+    'лента', 'пост', 'группа', 'автор', 'текст', 'дневник', 'запись',
+    'новость', 'заметка', 'история', 'сегодня', 'вчера', 'город', 'кот',
+)
+
+
+@contextlib.contextmanager
+def explicit_timestamps():
+    """Позволяет задать pub_date и updated_at вручную при bulk_create.
+
+    auto_now и auto_now_add перезаписывают любое переданное значение,
+    поэтому на время загрузки они отключаются.
+    """
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Post._meta.get_field('updated_at'),
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+@contextlib.contextmanager
+def relaxed_durability(connection):
+    """На время загрузки отключает ожидание сброса на диск при коммите.
+
+    При сбое могут потеряться последние пачки, но не целостность базы.
+    Внутри уже открытой транзакции ничего не меняет: SQLite не дает
+    менять synchronous посреди транзакции.
+    """
+    if connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous = OFF')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SET synchronous_commit TO OFF')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+            elif connection.vendor == 'postgresql':
+                cursor.execute('RESET synchronous_commit')
+
+
+def random_text(rng, words=30):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def seed_users(count, prefix='seed_user', batch_size=1000):
+    """Создает пользователей пачками и возвращает их id."""
+    password = make_password(None)
+    users = (
+        User(username=f'{prefix}_{i}', password=password)
+        for i in range(count)
+    )
+    bulk_create_in_batches(User, users, batch_size, ignore_conflicts=True)
+    return list(
+        User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).values_list('pk', flat=True)
+    )
+
+
+def seed_groups(count, prefix='seed-group', batch_size=1000):
+    """Создает группы пачками и возвращает их id."""
+    groups = (
+        Group(
+            title=f'Группа {i}',
+            slug=f'{prefix}-{i}',
+            description=f'Описание группы {i}',
+        )
+        for i in range(count)
+    )
+    bulk_create_in_batches(Group, groups, batch_size, ignore_conflicts=True)
+    return list(
+        Group.objects.filter(
+            slug__startswith=f'{prefix}-'
+        ).values_list('pk', flat=True)
+    )
+
+
+def generate_posts(count, author_ids, group_ids, seed=0):
+    """Генерирует посты с датами, равномерно уходящими в прошлое."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    for i in range(count):
+        group_id = rng.choice(group_ids) if group_ids and i % 4 else None
+        pub_date = now - timedelta(seconds=count - i)
+        yield Post(
+            text=random_text(rng),
+            pub_date=pub_date,
+            updated_at=pub_date,
+            author_id=rng.choice(author_ids),
+            group_id=group_id,
+        )
+
+
+def read_jsonl(lines):
+    """Читает посты из JSONL построчно."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_csv(lines):
+    """Читает посты из CSV с заголовком построчно."""
+    yield from csv.DictReader(lines)
+
+
+class RowResolver:
+    """Находит id авторов и групп по именам из импортируемых записей.
+
+    Найденные id запоминаются, поэтому база опрашивается один раз
+    на каждое имя.
+    """
+
+    def __init__(self, create_missing=False):
+        self.create_missing = create_missing
+        self.password = make_password(None)
+        self.authors = {}
+        self.groups = {}
+
+    def author_id(self, username):
+        if username not in self.authors:
+            author_id = User.objects.filter(
+                username=username
+            ).values_list('pk', flat=True).first()
+            if author_id is None:
+                if not self.create_missing or not username:
+                    raise ValueError(f'неизвестный автор {username!r}')
+                author_id = User.objects.create(
+                    username=username, password=self.password
+                ).pk
+            self.authors[username] = author_id
+        return self.authors[username]
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            group_id = Group.objects.filter(
+                slug=slug
+            ).values_list('pk', flat=True).first()
+            if group_id is None:
+                if not self.create_missing:
+                    raise ValueError(f'неизвестная группа {slug!r}')
+                group_id = Group.objects.create(
+                    title=slug, slug=slug, description=''
+                ).pk
+            self.groups[slug] = group_id
+        return self.groups[slug]
+
+    @staticmethod
+    def pub_date(value):
+        if not value:
+            return timezone.now()
+        pub_date = parse_datetime(value)
+        if pub_date is None:
+            raise ValueError(f'неверная дата {value!r}')
+        if timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        return pub_date
+
+
+def rows_to_posts(rows, create_missing=False):
+    """Превращает записи вида {'text', 'author', 'group', 'pub_date'}
+    в несохраненные посты.
+
+    author - username, group - slug группы (необязательно),
+    pub_date - дата в ISO 8601 (необязательно).
+    """
+    resolver = RowResolver(create_missing)
+    for number, row in enumerate(rows, start=1):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError(
+                    f'ожидается объект, получено {type(row).__name__}'
+                )
+            pub_date = resolver.pub_date(row.get('pub_date'))
+            yield Post(
+                text=row['text'],
+                pub_date=pub_date,
+                updated_at=pub_date,
+                author_id=resolver.author_id(row.get('author')),
+                group_id=resolver.group_id(row.get('group')),
+            )
+        except (KeyError, ValueError) as error:
+            raise ValueError(f'Запись {number}: {error}') from error
+
+
+def import_posts(posts, batch_size=5000, progress=None):
+    """Записывает посты из итератора пачками.
+
+    Сигналы при bulk_create не срабатывают, поэтому счетчики
+    пересчитываются, посты раскладываются по лентам подписчиков их
+    авторов и кэши сбрасываются один раз в конце. Статистика таблицы
+    тоже обновляется: по ней FeedPaginator оценивает размер ленты.
+    Все это делается и при ошибке посреди загрузки: уже записанные
+    пачки остаются в базе.
+    """
+    author_ids = set()
+
+    def remember_authors(posts):
+        for post in posts:
+            author_ids.add(post.author_id)
+            yield post
+
+    try:
+        with explicit_timestamps():
+            return bulk_create_in_batches(
+                Post, remember_authors(posts), batch_size, progress
+            )
+    finally:
+        analyze_tables(connection, [Post._meta.db_table])
+        reconcile_author_counters()
+        reconcile_group_counters()
+        fan_out_authors(author_ids)
+        invalidate_groups()
+        bump_generation()
+
+
+def seed_posts(posts, users, groups, batch_size=5000, progress=None):
+    """Наполняет базу синтетическими пользователями, группами и постами."""
+    author_ids = seed_users(users)
+    group_ids = seed_groups(groups)
+    return import_posts(
+        generate_posts(posts, author_ids, group_ids), batch_size, progress
+    )
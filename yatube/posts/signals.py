@@ -0,0 +1,154 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache import (bump_generation, invalidate_group, invalidate_group_by_id,
+                    invalidate_posts)
+from .counters import change_author_posts_count, change_group_posts_count
+from .invalidation import posts_changed
+from .models import Follow, Group, Post, User
+from .timeline import (backfill_timeline, fan_out_post, remove_from_timeline,
+                       resume_fan_out)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """Запоминает прежних автора и группу поста перед сохранением."""
+    instance._previous_state = None
+    if instance.pk is not None:
+        instance._previous_state = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('author_id', 'group_id').first()
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    if created:
+        change_author_posts_count(instance.author_id, 1)
+        move_post_between_groups(None, instance.group_id)
+        return
+    previous_state = getattr(instance, '_previous_state', None)
+    if previous_state is None:
+        return
+    previous_author_id, previous_group_id = previous_state
+    if previous_author_id != instance.author_id:
+        change_author_posts_count(previous_author_id, -1)
+        change_author_posts_count(instance.author_id, 1)
+        resume_fan_out(previous_author_id)
+    move_post_between_groups(previous_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    change_author_posts_count(instance.author_id, -1)
+    move_post_between_groups(instance.group_id, None)
+    resume_fan_out(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_on_create(sender, instance, created, **kwargs):
+    """Раскладывает новый пост по лентам подписчиков."""
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_on_follow(sender, instance, created, **kwargs):
+    if created:
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline_on_unfollow(sender, instance, **kwargs):
+    remove_from_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def notify_post_changed(sender, instance, **kwargs):
+    posts_changed.send(sender=sender, post_ids=[instance.pk])
+
+
+@receiver(posts_changed)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_generation_on_change(sender, **kwargs):
+    """Новое поколение лент после любого изменения постов и групп.
+
+    Подписки поколение не меняют: их состояние уже входит в отметки
+    profile_stamp и follow_stamp, а страницы анонимов от них
+    не зависят.
+    """
+    bump_generation()
+
+
+@receiver(posts_changed)
+def invalidate_post_cache(sender, post_ids, **kwargs):
+    invalidate_posts(post_ids)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_posts_cache(sender, instance, **kwargs):
+    """Закэшированные посты группы хранят ее название и slug."""
+    invalidate_posts(
+        Post.objects.filter(group=instance).values_list('pk', flat=True)
+    )
+
+
+def move_post_between_groups(old_group_id, new_group_id):
+    """Переносит пост между счетчиками групп и сбрасывает их кэш."""
+    if old_group_id == new_group_id:
+        return
+    for group_id, delta in ((old_group_id, -1), (new_group_id, 1)):
+        if group_id is not None:
+            change_group_posts_count(group_id, delta)
+            invalidate_group_by_id(group_id)
+
+
+@receiver(pre_save, sender=User)
+def remember_author_name(sender, instance, update_fields=None, **kwargs):
+    instance._previous_name = None
+    # Вход пользователя сохраняет только last_login
+    if update_fields is not None and not (
+            {'first_name', 'last_name'} & set(update_fields)):
+        return
+    if instance.pk is not None:
+        instance._previous_name = User.objects.filter(
+            pk=instance.pk
+        ).values_list('first_name', 'last_name').first()
+
+
+@receiver(post_save, sender=User)
+def touch_posts_on_rename(sender, instance, **kwargs):
+    """Имя автора выводится в карточках его постов: переименование
+    отмечается как изменение постов (сброс кэша постов, новое
+    поколение лент, новые ETag). Без постов меняется только поколение.
+    """
+    previous_name = getattr(instance, '_previous_name', None)
+    if previous_name in (None, (instance.first_name, instance.last_name)):
+        return
+    if not Post.objects.filter(author=instance).update():
+        bump_generation()
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk is not None:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_on_save(sender, instance, **kwargs):
+    invalidate_group(instance.slug)
+    previous_slug = getattr(instance, '_previous_slug', None)
+    if previous_slug not in (None, instance.slug):
+        invalidate_group(previous_slug)
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_group_on_delete(sender, instance, **kwargs):
+    invalidate_group(instance.slug)
@@ -0,0 +1,45 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.benchmark import compare_with_baseline, percentile
+
+
+class BenchmarkTests(TestCase):
+    def test_percentile(self):
+        """Перцентиль считается методом ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_bench_views_reports_all_scenarios(self):
+        """Команда bench_views выдает JSON по всем сценариям."""
+        stdout = StringIO()
+        call_command(
+            'bench_views', seed=30, users=3, groups=2, requests=2,
+            mode='client', stdout=stdout,
+        )
+        results = json.loads(stdout.getvalue())
+        self.assertEqual(
+            set(results['modes']['client']),
+            {'index', 'index_deep', 'group_posts', 'profile',
+             'post_detail', 'post_create', 'post_edit'},
+        )
+        self.assertGreater(results['peak_rss_kb'], 0)
+
+    def test_baseline_comparison(self):
+        """Рост p95 сверх допуска и рост числа запросов - регрессия."""
+        baseline = {'modes': {'client': {'index': {
+            'p95_ms': 10, 'queries_per_request': 2,
+        }}}}
+        ok = {'modes': {'client': {'index': {
+            'p95_ms': 11, 'queries_per_request': 2,
+        }}}}
+        slow = {'modes': {'client': {'index': {
+            'p95_ms': 20, 'queries_per_request': 3,
+        }}}}
+        self.assertEqual(compare_with_baseline(ok, baseline, 0.2), [])
+        self.assertEqual(len(compare_with_baseline(slow, baseline, 0.2)), 2)
@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorPostCounter, Group, Post, User
+
+
+class AuthorPostCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.other_user = User.objects.create_user(username='other')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_count(self, user):
+        return AuthorPostCounter.objects.get(author=user).posts_count
+
+    def test_counter_follows_create_and_delete(self):
+        """Счетчик растет при создании поста и уменьшается при удалении."""
+        post = Post.objects.create(author=self.author_user, text='Тест.')
+        Post.objects.create(author=self.author_user, text='Тест.')
+        self.assertEqual(self.get_count(self.author_user), 2)
+        post.delete()
+        self.assertEqual(self.get_count(self.author_user), 1)
+
+    def test_counter_follows_author_change(self):
+        """При смене автора пост переходит в счетчик нового автора."""
+        post = Post.objects.create(author=self.author_user, text='Тест.')
+        post.author = self.other_user
+        post.save()
+        self.assertEqual(self.get_count(self.author_user), 0)
+        self.assertEqual(self.get_count(self.other_user), 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_post_counters исправляет расхождения."""
+        Post.objects.create(author=self.author_user, text='Тест.')
+        AuthorPostCounter.objects.filter(author=self.author_user).update(
+            posts_count=42
+        )
+        AuthorPostCounter.objects.filter(author=self.other_user).delete()
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.assertEqual(self.get_count(self.author_user), 1)
+        self.assertEqual(self.get_count(self.other_user), 0)
+
+    def test_pages_show_counter(self):
+        """Профиль и страница поста выводят значение счетчика."""
+        post = Post.objects.create(author=self.author_user, text='Тест.')
+        pages = (
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.author_user.username}
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        )
+        for address in pages:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertEqual(response.context['posts_count'], 1)
+
+
+class GroupPostCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.group_1 = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test-slug_1',
+            description='Тестовое описание 1',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='test-slug_2',
+            description='Тестовое описание 2',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author_user)
+        cache.clear()
+
+    def get_count(self, group):
+        return Group.objects.get(pk=group.pk).posts_count
+
+    def test_counter_follows_post_moves(self):
+        """Счетчики групп следуют за созданием, переносом и удалением."""
+        post = Post.objects.create(
+            author=self.author_user, text='Тест.', group=self.group_1
+        )
+        self.assertEqual(self.get_count(self.group_1), 1)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Тест.', 'group': self.group_2.id},
+        )
+        self.assertEqual(self.get_count(self.group_1), 0)
+        self.assertEqual(self.get_count(self.group_2), 1)
+        Post.objects.get(pk=post.pk).delete()
+        self.assertEqual(self.get_count(self.group_2), 0)
+
+    def test_group_page_header_is_invalidated(self):
+        """Кэш заголовка группы сбрасывается при появлении поста."""
+        address = reverse(
+            'posts:group_list', kwargs={'slug': self.group_1.slug}
+        )
+        response = self.guest_client.get(address)
+        self.assertEqual(response.context['group'].posts_count, 0)
+        Post.objects.create(
+            author=self.author_user, text='Тест.', group=self.group_1
+        )
+        response = self.guest_client.get(address)
+        self.assertEqual(response.context['group'].posts_count, 1)
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_reconcile_command_fixes_group_drift(self):
+        """Команда reconcile_post_counters исправляет счетчики групп."""
+        Group.objects.filter(pk=self.group_1.pk).update(posts_count=7)
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.assertEqual(self.get_count(self.group_1), 0)
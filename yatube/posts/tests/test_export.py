@@ -0,0 +1,110 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.export import export_rows
+from posts.models import Group, Post, User
+
+
+class PostExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.other_user = User.objects.create_user(username='other')
+        cls.staff_user = User.objects.create_user(
+            username='staff', is_staff=True
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=cls.author_user, text='Пост в группе', group=cls.group
+        )
+        for i in range(4):
+            Post.objects.create(author=cls.other_user, text=f'Пост {i}')
+        cls.address = reverse('posts:export')
+
+    def setUp(self):
+        self.user_client = Client()
+        self.user_client.force_login(PostExportTests.author_user)
+        self.staff_client = Client()
+        self.staff_client.force_login(PostExportTests.staff_user)
+
+    def get_export(self, **params):
+        response = self.staff_client.get(self.address, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return b''.join(response.streaming_content)
+
+    def test_export_is_for_staff_only(self):
+        """Выгрузка доступна только персоналу."""
+        for client in (Client(), self.user_client):
+            with self.subTest(client=client):
+                response = client.get(self.address)
+                self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_jsonl_export_contains_all_posts(self):
+        """JSONL содержит все посты в порядке id с автором и группой."""
+        rows = [
+            json.loads(line)
+            for line in self.get_export().decode().splitlines()
+        ]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            list(Post.objects.order_by('id').values_list('id', flat=True)),
+        )
+        self.assertEqual(rows[0]['author'], 'auth')
+        self.assertEqual(rows[0]['group'], 'test-slug')
+
+    def test_export_filters(self):
+        """Выгрузка фильтруется по группе, автору и интервалу дат."""
+        cases = (
+            ({'group': 'test-slug'}, 1),
+            ({'author': 'other'}, 4),
+            ({'since': '2000-01-01', 'until': '2000-12-31'}, 0),
+        )
+        for params, expected in cases:
+            with self.subTest(params=params):
+                content = self.get_export(format='csv', **params)
+                rows = list(csv.DictReader(io.StringIO(content.decode())))
+                self.assertEqual(len(rows), expected)
+
+    def test_invalid_date_is_rejected(self):
+        """Неверная дата в фильтре - ответ 400."""
+        response = self.staff_client.get(self.address, {'since': 'вчера'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_gzip_export(self):
+        """С gzip=1 выгрузка сжимается на лету."""
+        content = gzip.decompress(self.get_export(gzip='1'))
+        self.assertEqual(len(content.decode().splitlines()), 5)
+
+    def test_rows_are_read_in_keyset_chunks(self):
+        """Выгрузка читает посты пачками по id, по запросу на пачку."""
+        with self.assertNumQueries(3):
+            rows = list(export_rows(chunk_size=2))
+        self.assertEqual(len(rows), 5)
+
+    def test_command_writes_file(self):
+        """Команда export_posts пишет выгрузку в файл."""
+        descriptor, path = tempfile.mkstemp(suffix='.csv.gz')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'export_posts', path, format='csv', gzip=True,
+            author='auth', stdout=StringIO(),
+        )
+        with gzip.open(path, 'rt', encoding='utf-8') as export_file:
+            rows = list(csv.DictReader(export_file))
+        self.assertEqual(rows[0]['text'], 'Пост в группе')
@@ -0,0 +1,208 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.cache import get_generation
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.seed import import_posts, rows_to_posts
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.follower_user = User.objects.create_user(username='follower')
+        cls.other_user = User.objects.create_user(username='other')
+        cls.old_post = Post.objects.create(
+            author=cls.author_user, text='Старый пост'
+        )
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(FollowFeedTests.follower_user)
+        self.other_client = Client()
+        self.other_client.force_login(FollowFeedTests.other_user)
+        cache.clear()
+
+    def follow(self, client=None):
+        client = client or self.follower_client
+        return client.post(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.author_user.username}
+            )
+        )
+
+    def feed(self, client=None):
+        client = client or self.follower_client
+        response = client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_and_unfollow(self):
+        """Подписка создается и удаляется, на себя подписаться нельзя."""
+        self.follow()
+        self.assertTrue(Follow.objects.filter(
+            user=self.follower_user, author=self.author_user
+        ).exists())
+        self.follower_client.post(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.author_user.username}
+            )
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        author_client = Client()
+        author_client.force_login(self.author_user)
+        self.follow(author_client)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_requires_post_with_csrf(self):
+        """Подписка и отписка не выполняются по GET и без CSRF-токена."""
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.follower_client.get(
+                    reverse(name, kwargs={
+                        'username': self.author_user.username
+                    })
+                )
+                self.assertEqual(response.status_code, 405)
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.follower_user)
+        response = self.follow(csrf_client)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_keeps_cache_generation(self):
+        """Подписка не сбрасывает кэш лент, но меняет ETag профиля."""
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': self.author_user.username}
+        )
+        etag = self.follower_client.get(profile_url)['ETag']
+        generation = get_generation()
+        self.follow()
+        self.assertEqual(get_generation(), generation)
+        self.assertNotEqual(
+            self.follower_client.get(profile_url)['ETag'], etag
+        )
+
+    def test_feed_etag_follows_changes(self):
+        """ETag ленты подписок меняется при подписке, новом посте
+        и отписке, а без изменений позволяет ответить 304.
+        """
+        address = reverse('posts:follow_index')
+        etags = [self.follower_client.get(address)['ETag']]
+        self.follow()
+        etags.append(self.follower_client.get(address)['ETag'])
+        Post.objects.create(author=self.author_user, text='Новый')
+        etags.append(self.follower_client.get(address)['ETag'])
+        self.follower_client.post(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.author_user.username}
+            )
+        )
+        etags.append(self.follower_client.get(address)['ETag'])
+        self.assertEqual(len(set(etags)), 4)
+        response = self.follower_client.get(
+            address, HTTP_IF_NONE_MATCH=etags[-1]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_feed_reads_timeline_once(self):
+        """Повторный показ ленты: подписки и последняя запись ленты
+        читаются по одному разу, число записей берется из кэша.
+        """
+        self.follow()
+        self.feed()
+        with CaptureQueriesContext(connection) as context:
+            self.feed()
+        queries = [query['sql'] for query in context.captured_queries]
+        follows = [sql for sql in queries if '"posts_follow"' in sql]
+        self.assertEqual(len(follows), 1)
+        self.assertFalse(any('COUNT' in sql for sql in queries))
+        self.assertFalse(any('MAX' in sql for sql in queries))
+
+    def test_new_post_reaches_followers_only(self):
+        """Новый пост попадает в ленту подписчика и не попадает
+        в ленту остальных.
+        """
+        self.follow()
+        post = Post.objects.create(author=self.author_user, text='Новый')
+        self.assertEqual(self.feed(), [post, self.old_post])
+        self.assertEqual(self.feed(self.other_client), [])
+
+    def test_follow_backfills_timeline(self):
+        """При подписке в ленту попадают уже опубликованные посты."""
+        self.follow()
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_profile_shows_follow_state(self):
+        """Профиль показывает, подписан ли пользователь на автора."""
+        address = reverse(
+            'posts:profile', kwargs={'username': self.author_user.username}
+        )
+        response = self.follower_client.get(address)
+        self.assertFalse(response.context['following'])
+        self.follow()
+        response = self.follower_client.get(address)
+        self.assertTrue(response.context['following'])
+
+    @mock.patch('posts.timeline.FEED_FANOUT_BATCH_SIZE', 2)
+    def test_fan_out_is_batched(self):
+        """Пост раскладывается по лентам пачками."""
+        for i in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader_{i}'),
+                author=self.author_user,
+            )
+        with CaptureQueriesContext(connection) as context:
+            post = Post.objects.create(author=self.author_user, text='Пост')
+        inserts = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('INSERT')
+            and '"posts_timelineentry"' in query['sql']
+        ]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 5)
+
+    @mock.patch('posts.timeline.FEED_FANOUT_MAX_AUTHOR_POSTS', 1)
+    def test_prolific_author_is_pulled_on_read(self):
+        """Посты очень активного автора не раскладываются при записи,
+        а подмешиваются в ленту при чтении.
+        """
+        self.follow()
+        Post.objects.create(author=self.author_user, text='Второй')
+        post = Post.objects.create(author=self.author_user, text='Третий')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed()[0], post)
+        self.assertEqual(len(self.feed()), 3)
+
+    @mock.patch('posts.timeline.FEED_FANOUT_MAX_AUTHOR_POSTS', 1)
+    def test_posts_stay_in_feed_after_author_drops_below_limit(self):
+        """Пост, написанный сверх порога, остается в ленте, когда
+        автор после удаления снова раскладывает посты при записи.
+        """
+        self.follow()
+        post = Post.objects.create(author=self.author_user, text='Второй')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Post.objects.filter(pk=self.old_post.pk).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            post=post, user=self.follower_user
+        ).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_imported_posts_reach_followers(self):
+        """Посты из импорта попадают в ленты подписчиков автора."""
+        self.follow()
+        import_posts(rows_to_posts([
+            {'text': 'Импорт', 'author': self.author_user.username},
+        ]))
+        self.assertEqual(
+            [post.text for post in self.feed()], ['Импорт', 'Старый пост']
+        )
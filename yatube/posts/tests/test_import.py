@@ -0,0 +1,115 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.models import AuthorPostCounter, Group, Post, User
+from posts.search import search_posts
+
+JSONL = (
+    '{"text": "Первый пост", "author": "auth", "group": "test-slug", '
+    '"pub_date": "2022-01-01T10:00:00"}\n'
+    '{"text": "Второй пост", "author": "auth"}\n'
+)
+
+CSV = (
+    'text,author,group,pub_date\n'
+    'Пост из таблицы,newbie,new-group,2022-02-01T10:00:00\n'
+)
+
+
+class ImportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def write_source(self, content, suffix):
+        descriptor, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as source:
+            source.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_jsonl_import_keeps_dates_and_counters(self):
+        """Импорт JSONL сохраняет даты и пересчитывает счетчики."""
+        path = self.write_source(JSONL, '.jsonl')
+        call_command(
+            'import_posts', path, batch_size=1, stdout=StringIO()
+        )
+        post = Post.objects.get(text='Первый пост')
+        self.assertEqual(post.pub_date.year, 2022)
+        self.assertEqual(post.updated_at, post.pub_date)
+        self.assertEqual(
+            AuthorPostCounter.objects.get(
+                author=self.author_user
+            ).posts_count,
+            2,
+        )
+        self.assertEqual(Group.objects.get(pk=self.group.pk).posts_count, 1)
+        self.assertEqual(
+            search_posts(Post.objects.all(), 'первый').count(), 1
+        )
+
+    def test_csv_import_creates_missing(self):
+        """С --create-missing создаются неизвестные авторы и группы."""
+        path = self.write_source(CSV, '.csv')
+        call_command(
+            'import_posts',
+            path,
+            create_missing=True,
+            defer_search_index=True,
+            stdout=StringIO(),
+        )
+        post = Post.objects.select_related('author', 'group').get()
+        self.assertEqual(post.author.username, 'newbie')
+        self.assertEqual(post.group.posts_count, 1)
+        self.assertEqual(
+            search_posts(Post.objects.all(), 'таблицы').count(), 1
+        )
+
+    def test_unknown_author_is_reported(self):
+        """Неизвестный автор без --create-missing - ошибка команды."""
+        path = self.write_source(CSV, '.csv')
+        with self.assertRaisesMessage(CommandError, 'Запись 1'):
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+
+    def test_failed_import_keeps_counters(self):
+        """Запись не-объект - ошибка с номером строки, а уже загруженные
+        посты учтены в счетчиках.
+        """
+        path = self.write_source(
+            '{"text": "Первый пост", "author": "auth"}\n[1, 2]\n', '.jsonl'
+        )
+        with self.assertRaisesMessage(CommandError, 'Запись 2'):
+            call_command(
+                'import_posts', path, batch_size=1, stdout=StringIO()
+            )
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(
+            AuthorPostCounter.objects.get(
+                author=self.author_user
+            ).posts_count,
+            1,
+        )
+
+    def test_synthesize(self):
+        """--synthesize создает заданное число постов."""
+        call_command(
+            'import_posts',
+            synthesize=30,
+            users=3,
+            groups=2,
+            batch_size=7,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 30)
@@ -1,5 +1,8 @@
+from unittest import mock
+
 from django.test import TestCase
 
+from posts.invalidation import posts_changed
 from posts.models import Group, Post, User
 
 
@@ -38,6 +41,7 @@ class PostModelTest(TestCase):
         field_verboses = {
             'text': 'Текст поста',
             'pub_date': 'Дата публикации',
+            'updated_at': 'Дата изменения',
             'author': 'Автор',
             'group': 'Группа',
         }
@@ -59,3 +63,44 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+    def test_post_changes_are_announced(self):
+        """Сохранение и массовое обновление постов оповещают
+        подписчиков posts_changed и обновляют updated_at.
+        """
+        received = []
+
+        def receiver(sender, post_ids, **kwargs):
+            received.append(post_ids)
+
+        posts_changed.connect(receiver)
+        self.addCleanup(posts_changed.disconnect, receiver)
+        post = PostModelTest.post
+        updated_at = Post.objects.get(pk=post.pk).updated_at
+        post.save()
+        Post.objects.filter(pk=post.pk).update(text='Новый текст.')
+        self.assertEqual(received, [[post.pk], [post.pk]])
+        self.assertGreater(
+            Post.objects.get(pk=post.pk).updated_at, updated_at
+        )
+
+    @mock.patch('posts.models.POSTS_CHANGED_BATCH_SIZE', 2)
+    def test_bulk_update_announces_posts_in_batches(self):
+        """Массовое обновление передает id постов пачками."""
+        received = []
+
+        def receiver(sender, post_ids, **kwargs):
+            received.append(sorted(post_ids))
+
+        Post.objects.bulk_create(
+            Post(author=PostModelTest.user, text=f'Пост {number}')
+            for number in range(4)
+        )
+        posts_changed.connect(receiver)
+        self.addCleanup(posts_changed.disconnect, receiver)
+        Post.objects.update(text='Новый текст.')
+        self.assertEqual([len(batch) for batch in received], [2, 2, 1])
+        self.assertEqual(
+            sorted(sum(received, [])),
+            sorted(Post.objects.values_list('pk', flat=True)),
+        )
@@ -0,0 +1,217 @@
+import statistics
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.db.statistics import analyze_tables
+from posts.models import Group, Post, User
+from posts.paginators import CursorPage, CursorPaginator, FeedPaginator
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        # Создаем 15 постов
+        for i in range(15):
+            Post.objects.create(
+                author=cls.author_user,
+                text=f'Тест {i}.',
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def test_first_page(self):
+        """Первая страница содержит 10 новейших постов."""
+        page = self.paginator.get_page(None)
+        expected = list(Post.objects.order_by('-pub_date', '-pk')[:10])
+        self.assertEqual(list(page), expected)
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_next_and_previous_pages(self):
+        """Курсоры ведут на следующую и обратно на предыдущую страницу."""
+        first_page = self.paginator.get_page(None)
+        second_page = self.paginator.get_page(first_page.next_cursor)
+        expected = list(Post.objects.order_by('-pub_date', '-pk')[10:])
+        self.assertEqual(list(second_page), expected)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        back_page = self.paginator.get_page(second_page.previous_cursor)
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Поврежденный курсор дает первую страницу."""
+        page = self.paginator.get_page('не-курсор')
+        self.assertEqual(list(page), list(self.paginator.get_page(None)))
+
+    def test_feed_views_accept_cursor(self):
+        """Ленты переходят в keyset-режим при наличии ?cursor=."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.author_user.username}
+            ),
+        )
+        for address in pages:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address + '?cursor=')
+                page_obj = response.context['page_obj']
+                self.assertIsInstance(page_obj, CursorPage)
+                self.assertEqual(len(page_obj), 10)
+                response = self.guest_client.get(
+                    address + '?cursor=' + page_obj.next_cursor
+                )
+                self.assertEqual(len(response.context['page_obj']), 5)
+
+
+class ElidedPageRangeTests(SimpleTestCase):
+    def page_range(self, pages, number):
+        paginator = FeedPaginator(range(pages), 1)
+        return list(paginator.get_elided_page_range(number))
+
+    def test_short_range_is_not_elided(self):
+        """Короткий список страниц выводится целиком."""
+        self.assertEqual(self.page_range(5, 3), [1, 2, 3, 4, 5])
+
+    def test_long_range_is_elided(self):
+        """В длинном списке остаются края и окно вокруг текущей."""
+        ellipsis = FeedPaginator.ELLIPSIS
+        cases = (
+            (1, [1, 2, 3, 4, ellipsis, 99, 100]),
+            (50, [1, 2, ellipsis, 47, 48, 49, 50, 51, 52, 53, ellipsis,
+                  99, 100]),
+            (100, [1, 2, ellipsis, 97, 98, 99, 100]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(self.page_range(100, number), expected)
+
+    def test_render_is_flat_in_page_count(self):
+        """Размер и время рендеринга паджинатора не растут с числом
+        страниц.
+        """
+        results = {}
+        for pages in (100, 200000):
+            page_obj = FeedPaginator(range(pages), 1).get_page(pages // 2)
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                body = render_to_string(
+                    'posts/includes/paginator.html', {'page_obj': page_obj}
+                )
+                timings.append(time.perf_counter() - started)
+            results[pages] = (len(body), statistics.median(timings))
+        small_size, small_time = results[100]
+        large_size, large_time = results[200000]
+        # Номера страниц длиннее на несколько цифр, но их столько же
+        self.assertLess(large_size - small_size, 200)
+        self.assertLess(large_time, small_time * 5 + 0.005)
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(15):
+            Post.objects.create(author=cls.user, text=f'Тест {i}.')
+        analyze_tables(connection, [Post._meta.db_table])
+        # Статистика отстает от таблицы на два поста
+        for i in range(2):
+            Post.objects.create(
+                author=cls.user, text=f'Новый {i}.', group=cls.group
+            )
+
+    def test_estimate_above_threshold(self):
+        """Выше порога количество берется из статистики без COUNT(*)."""
+        paginator = FeedPaginator(
+            Post.objects.all(), 10, estimate_threshold=10
+        )
+        with self.assertNumQueries(1) as context:
+            self.assertEqual(paginator.count, 15)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
+        self.assertTrue(paginator.count_is_estimate)
+
+    def test_pages_past_stale_estimate_are_reachable(self):
+        """Устаревшая оценка не прячет старые посты: страницы дальше
+        нее отдаются, пока в них есть записи.
+        """
+        paginator = FeedPaginator(
+            Post.objects.all(), 5, estimate_threshold=10
+        )
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertTrue(paginator.get_page(3).has_next())
+        last_page = paginator.get_page(4)
+        self.assertEqual(last_page.number, 4)
+        self.assertEqual(
+            [post.text for post in last_page], ['Тест 1.', 'Тест 0.']
+        )
+        self.assertFalse(last_page.has_next())
+        self.assertEqual(paginator.num_pages, 4)
+        self.assertEqual(paginator.get_page(9).number, 4)
+
+    def test_exact_below_threshold_and_for_filtered(self):
+        """Ниже порога и для отфильтрованной выборки счет точный."""
+        cases = (
+            (Post.objects.all(), 100, 17),
+            (Post.objects.filter(group=self.group), 10, 2),
+            (Post.objects.all(), None, 17),
+        )
+        for queryset, threshold, expected in cases:
+            with self.subTest(threshold=threshold):
+                paginator = FeedPaginator(
+                    queryset, 10, estimate_threshold=threshold
+                )
+                self.assertEqual(paginator.count, expected)
+                self.assertFalse(paginator.count_is_estimate)
+
+    @mock.patch('posts.views.FEED_ESTIMATED_COUNT_THRESHOLD', 10)
+    def test_index_does_not_count_large_table(self):
+        """Отметка главной и ее паджинатор обходятся без COUNT:
+        время изменения берется по индексу, число - из статистики.
+        """
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = Client().get(reverse('posts:index'))
+        paginator = response.context['page_obj'].paginator
+        self.assertTrue(paginator.count_is_estimate)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(any('COUNT' in sql for sql in queries))
+
+    @mock.patch('posts.views.FEED_ESTIMATED_COUNT_THRESHOLD', 10)
+    def test_index_shows_approximate_page_count(self):
+        """Главная пишет «около N» страниц, группа - нет."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:index'))
+        paginator = response.context['page_obj'].paginator
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertContains(response, 'Страниц: около 2')
+        response = client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        )
+        self.assertNotContains(response, 'Страниц: около')
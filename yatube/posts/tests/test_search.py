@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.admin_user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.post_cat = Post.objects.create(
+            author=cls.author_user,
+            text='Кот спит на подоконнике.',
+        )
+        cls.post_cats = Post.objects.create(
+            author=cls.author_user,
+            text='Кот и кошка. Кот снова спит, кот доволен.',
+        )
+        cls.post_dog = Post.objects.create(
+            author=cls.author_user,
+            text='Собака гуляет во дворе.',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.admin_client = Client()
+        self.admin_client.force_login(PostSearchTests.admin_user)
+
+    def test_search_finds_and_ranks_posts(self):
+        """Поиск находит посты по словам и выше ставит более
+        релевантные.
+        """
+        found = list(search_posts(Post.objects.all(), 'кот'))
+        self.assertEqual(
+            found, [PostSearchTests.post_cats, PostSearchTests.post_cat]
+        )
+
+    def test_search_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=PostSearchTests.post_dog.pk)
+        post.text = 'Теперь здесь енот.'
+        post.save()
+        self.assertFalse(search_posts(Post.objects.all(), 'собака'))
+        self.assertEqual(
+            list(search_posts(Post.objects.all(), 'енот')), [post]
+        )
+        post.delete()
+        self.assertFalse(search_posts(Post.objects.all(), 'енот'))
+
+    def test_search_ignores_query_syntax(self):
+        """Служебные символы в запросе не ломают поиск."""
+        found = search_posts(Post.objects.all(), 'кот" OR (NEAR')
+        self.assertFalse(found)
+        self.assertFalse(search_posts(Post.objects.all(), '"*()'))
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'собака'}
+        )
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page_obj']), [PostSearchTests.post_dog]
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через тот же индекс."""
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошка'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [PostSearchTests.post_cats]
+        )
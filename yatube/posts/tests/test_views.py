@@ -1,6 +1,17 @@
-from django.test import Client, TestCase
+import threading
+import time
+from http import HTTPStatus
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts.cache import (bump_generation, cache_page_for_anonymous,
+                         page_cache_key, post_card_cache_key)
 from posts.forms import PostForm
 from posts.models import Group, Post, User
 
@@ -312,3 +323,432 @@ class PaginatorViewsTest(TestCase):
             + '?page=2'
         )
         self.assertEqual(len(response.context['page_obj']), 5)
+
+
+# Проверка количества запросов к базе на страницах лент
+class FeedQueriesTest(TestCase):
+    # Бюджет запросов не зависит от числа постов на странице. Первый
+    # запрос после изменения считает отметку для ETag, она же заменяет
+    # COUNT(*) паджинатора. У главной это чтение статистики таблицы
+    # и MAX с COUNT (на большой таблице - только MAX); у группы число
+    # берется из ее счетчика, и отметка - это один MAX
+    QUERY_BUDGETS = {
+        'index': 3,
+        'group_list': 3,
+        'profile': 3,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Создаем 5 авторов
+        cls.authors = [
+            User.objects.create_user(username=f'auth_{i}') for i in range(5)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        # Создаем 15 постов разных авторов, часть из них без группы
+        for i in range(15):
+            Post.objects.create(
+                author=cls.authors[i % 5],
+                text='Тест.',
+                group=cls.group if i % 3 else None,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_feed_pages_fit_query_budget(self):
+        """Страницы лент укладываются в фиксированное число запросов."""
+        pages = {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list',
+                kwargs={'slug': FeedQueriesTest.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile',
+                kwargs={'username': FeedQueriesTest.authors[0].username}
+            ),
+        }
+        for name, address in pages.items():
+            with self.subTest(address=address):
+                with self.assertNumQueries(self.QUERY_BUDGETS[name]):
+                    self.guest_client.get(address)
+
+    def test_group_page_does_not_count_posts(self):
+        """Лента группы берет число постов из счетчика группы."""
+        address = reverse(
+            'posts:group_list', kwargs={'slug': FeedQueriesTest.group.slug}
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = self.guest_client.get(address)
+        self.assertEqual(response.context['page_obj'].paginator.count, 10)
+        self.assertFalse(any(
+            'COUNT' in query['sql'] for query in context.captured_queries
+        ))
+
+
+# Проверка кэширования карточек постов в лентах
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.author_user,
+            text='Тест.',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(PostCardCacheTest.author_user)
+        cache.clear()
+
+    def test_card_is_cached(self):
+        """После показа ленты карточка поста лежит в кэше."""
+        self.guest_client.get(reverse('posts:index'))
+        self.assertIsNotNone(
+            cache.get(post_card_cache_key(PostCardCacheTest.post))
+        )
+
+    def test_card_is_invalidated_on_edit(self):
+        """После редактирования лента показывает новый текст поста."""
+        self.guest_client.get(reverse('posts:index'))
+        self.author_client.post(
+            reverse(
+                'posts:post_edit',
+                kwargs={'post_id': PostCardCacheTest.post.id}
+            ),
+            data={'text': 'Новый текст.'},
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст.')
+
+    def test_card_follows_group_and_author(self):
+        """Карточка показывает новое название группы и имя автора."""
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.filter(pk=PostCardCacheTest.post.pk).update(group=group)
+        self.author_client.get(reverse('posts:index'))
+        group.title = 'Новая группа'
+        group.save()
+        author = User.objects.get(pk=PostCardCacheTest.author_user.pk)
+        author.first_name = 'Лев'
+        author.last_name = 'Толстой'
+        author.save()
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новая группа')
+        self.assertContains(response, 'Лев Толстой')
+
+
+# Проверка кэша постов на странице поста
+class PostObjectCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author_user,
+            text='Тест.',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(PostObjectCacheTest.author_user)
+        self.address = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': PostObjectCacheTest.post.id}
+        )
+        cache.clear()
+
+    def test_detail_is_served_without_queries(self):
+        """Повторный показ поста не обращается к базе."""
+        # Пост с автором и группой, счетчик постов автора
+        with self.assertNumQueries(2):
+            self.guest_client.get(self.address)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(self.address)
+        self.assertContains(response, 'Тестовая группа')
+
+    def test_cache_is_invalidated(self):
+        """Правка поста, его группы и новый пост автора видны сразу."""
+        self.guest_client.get(self.address)
+        self.author_client.post(
+            reverse(
+                'posts:post_edit',
+                kwargs={'post_id': PostObjectCacheTest.post.id}
+            ),
+            data={'text': 'Новый текст.', 'group': self.group.id},
+        )
+        self.group.title = 'Другое название'
+        self.group.save()
+        Post.objects.create(author=self.author_user, text='Второй.')
+        response = self.guest_client.get(self.address)
+        self.assertContains(response, 'Новый текст.')
+        self.assertContains(response, 'Другое название')
+        self.assertEqual(response.context['posts_count'], 2)
+
+    def test_author_rename_is_shown(self):
+        """Новое имя автора сразу видно на странице поста и в профиле
+        и меняет их ETag, в том числе у автора без постов.
+        """
+        idle_user = User.objects.create_user(username='idle')
+        addresses = (
+            self.address,
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:profile', kwargs={'username': 'idle'}),
+        )
+        etags = [self.guest_client.get(address)['ETag']
+                 for address in addresses]
+        for user in (
+            User.objects.get(pk=PostObjectCacheTest.author_user.pk),
+            idle_user,
+        ):
+            user.first_name = 'Лев'
+            user.last_name = user.username
+            user.save()
+        for address, etag in zip(addresses, etags):
+            with self.subTest(address=address):
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Лев')
+
+    def test_deleted_post_is_not_found(self):
+        """Удаленный пост не показывается из кэша."""
+        self.guest_client.get(self.address)
+        Post.objects.filter(pk=PostObjectCacheTest.post.id).delete()
+        response = self.guest_client.get(self.address)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+# Проверка кэширования страниц лент для анонимных пользователей
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.author_user,
+            text='Тест.',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(PageCacheTest.author_user)
+        cache.clear()
+
+    def test_anonymous_page_is_cached(self):
+        """Повторный анонимный запрос не обращается к базе."""
+        first_response = self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.content, first_response.content)
+
+    def test_new_post_is_shown_immediately(self):
+        """Новый пост сразу появляется в закэшированной ленте."""
+        self.guest_client.get(reverse('posts:index'))
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Свежий пост.'},
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост.')
+
+    def test_authorized_user_bypasses_cache(self):
+        """Авторизованный пользователь всегда получает свежую страницу."""
+        self.author_client.get(reverse('posts:index'))
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, PageCacheTest.author_user.username)
+
+
+# Проверка пересборки закэшированной страницы одним запросом
+class PageRebuildCoalescingTest(SimpleTestCase):
+    THREADS = 20
+
+    def setUp(self):
+        cache.clear()
+        self.rebuilds = 0
+        self.rebuilds_lock = threading.Lock()
+        self.status = HTTPStatus.OK
+        self.view = cache_page_for_anonymous(self.slow_view)
+
+    def slow_view(self, request):
+        with self.rebuilds_lock:
+            self.rebuilds += 1
+            number = self.rebuilds
+        # Долгий запрос к базе и рендеринг
+        time.sleep(0.2)
+        return HttpResponse(f'версия {number}', status=self.status)
+
+    def get(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def get_concurrently(self):
+        barrier = threading.Barrier(self.THREADS)
+        contents = []
+
+        def worker():
+            barrier.wait()
+            contents.append(self.get().content.decode())
+
+        threads = [
+            threading.Thread(target=worker) for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return contents
+
+    def test_cold_cache_is_built_once(self):
+        """При пустом кэше страницу собирает один запрос, остальные
+        дожидаются ее.
+        """
+        contents = self.get_concurrently()
+        self.assertEqual(self.rebuilds, 1)
+        self.assertEqual(contents, ['версия 1'] * self.THREADS)
+
+    def test_waiters_do_not_wait_for_uncached_response(self):
+        """Ответ, который не кладется в кэш (404), не заставляет
+        остальные запросы ждать до конца PAGE_REBUILD_WAIT.
+        """
+        self.status = HTTPStatus.NOT_FOUND
+        started = time.perf_counter()
+        contents = self.get_concurrently()
+        self.assertEqual(len(contents), self.THREADS)
+        self.assertLess(time.perf_counter() - started, 1)
+
+    def test_stale_page_is_served_during_rebuild(self):
+        """После смены поколения один запрос пересобирает страницу,
+        остальные сразу получают прошлую версию.
+        """
+        self.get()
+        bump_generation()
+        started = time.perf_counter()
+        contents = self.get_concurrently()
+        self.assertEqual(self.rebuilds, 2)
+        self.assertEqual(contents.count('версия 2'), 1)
+        self.assertEqual(contents.count('версия 1'), self.THREADS - 1)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(self.get().content.decode(), 'версия 2')
+
+
+# Проверка условных GET-запросов
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.author_user,
+            text='Тест.',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.addresses = (
+            reverse('posts:index'),
+            reverse(
+                'posts:profile',
+                kwargs={'username': ConditionalGetTest.author_user.username}
+            ),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': ConditionalGetTest.post.id}
+            ),
+        )
+
+    def test_matching_etag_returns_not_modified(self):
+        """Совпадающий ETag дает 304 без тела ответа."""
+        for address in self.addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                etag = response['ETag']
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertEqual(response.content, b'')
+
+    def test_matching_last_modified_returns_not_modified(self):
+        """Неизменившаяся дата Last-Modified дает 304."""
+        for address in self.addresses:
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                response = self.guest_client.get(
+                    address,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_stale_page_has_no_last_modified(self):
+        """Прошлая версия страницы во время пересборки отдается
+        без текущего Last-Modified.
+        """
+        address = reverse('posts:index')
+        cache.clear()
+        self.assertTrue(self.guest_client.get(address).has_header(
+            'Last-Modified'
+        ))
+        bump_generation()
+        # Страницу пересобирает другой запрос
+        lock_key = f'{page_cache_key(RequestFactory().get(address))}:lock'
+        cache.add(lock_key, 1)
+        response = self.guest_client.get(address)
+        self.assertTrue(response['ETag'].startswith('"stale-'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_etag_is_derived_from_data(self):
+        """ETag не зависит от состояния кэша: после его сброса те же
+        данные дают тот же ETag, а новые - другой.
+        """
+        for address in self.addresses:
+            with self.subTest(address=address):
+                etag = self.guest_client.get(address)['ETag']
+                cache.clear()
+                self.assertEqual(self.guest_client.get(address)['ETag'], etag)
+                cache.clear()
+                Post.objects.filter(pk=ConditionalGetTest.post.pk).update(
+                    text='Изменено.'
+                )
+                cache.clear()
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_new_post_changes_etag(self):
+        """После нового поста старый ETag больше не подходит."""
+        for address in self.addresses:
+            with self.subTest(address=address):
+                etag = self.guest_client.get(address)['ETag']
+                Post.objects.create(
+                    author=ConditionalGetTest.author_user,
+                    text='Тест.',
+                )
+                response = self.guest_client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
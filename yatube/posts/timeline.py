@@ -0,0 +1,180 @@
+"""Лента подписок с разворачиванием при записи (fan-out-on-write).
+
+Новый пост сразу раскладывается в таблицу TimelineEntry каждого
+подписчика пачками по FEED_FANOUT_BATCH_SIZE, и лента читателя - это
+один проход по индексу (user, -pub_date, -id).
+
+Посты очень активных авторов (больше FEED_FANOUT_MAX_AUTHOR_POSTS
+постов) не раскладываются: их подписчиков слишком много раз пришлось бы
+трогать на каждый пост. Такие посты добавляются в ленту при чтении
+(fan-out-on-read). Когда автор снова опускается до порога, его посты,
+написанные сверх порога, раскладываются задним числом (resume_fan_out).
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .batches import bulk_create_in_batches
+from .models import AuthorPostCounter, Follow, Post, TimelineEntry
+
+FEED_FANOUT_BATCH_SIZE = settings.FEED_FANOUT_BATCH_SIZE
+
+FEED_FANOUT_MAX_AUTHOR_POSTS = settings.FEED_FANOUT_MAX_AUTHOR_POSTS
+
+FEED_BACKFILL_POSTS = settings.FEED_BACKFILL_POSTS
+
+
+def fans_out_on_write(author_id):
+    """Раскладываются ли посты автора по лентам подписчиков."""
+    return not AuthorPostCounter.objects.filter(
+        author_id=author_id,
+        posts_count__gt=FEED_FANOUT_MAX_AUTHOR_POSTS,
+    ).exists()
+
+
+def timeline_entries(user_ids, post):
+    for user_id in user_ids:
+        yield TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+
+
+def fan_out_post(post):
+    """Добавляет пост в ленты всех подписчиков автора.
+
+    Подписчики читаются итератором и записываются пачками, поэтому
+    память не зависит от их числа. Возвращает число записей.
+    """
+    if not fans_out_on_write(post.author_id):
+        return 0
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).order_by().iterator(
+        chunk_size=FEED_FANOUT_BATCH_SIZE
+    )
+    return bulk_create_in_batches(
+        TimelineEntry,
+        timeline_entries(followers, post),
+        FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    if not fans_out_on_write(author_id):
+        return 0
+    posts = Post.objects.filter(author_id=author_id).only(
+        'pk', 'author_id', 'pub_date'
+    )[:FEED_BACKFILL_POSTS]
+    entries = (
+        entry for post in posts for entry in timeline_entries([user_id], post)
+    )
+    return bulk_create_in_batches(
+        TimelineEntry, entries, FEED_FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_authors(author_ids):
+    """Раскладывает все посты авторов по лентам их подписчиков.
+
+    Нужно, когда посты появились в обход fan_out_post: после импорта
+    и после возвращения автора к раскладке при записи. Уже разложенные
+    посты пропускаются. Постов у таких авторов не больше порога,
+    подписчики читаются итератором. Возвращает число записей.
+    """
+    created = 0
+    for author_id in author_ids:
+        if not fans_out_on_write(author_id):
+            continue
+        posts = list(Post.objects.filter(author_id=author_id).only(
+            'pk', 'author_id', 'pub_date'
+        ))
+        if not posts:
+            continue
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).order_by().iterator(
+            chunk_size=FEED_FANOUT_BATCH_SIZE
+        )
+        entries = (
+            entry
+            for user_id in followers
+            for post in posts
+            for entry in timeline_entries([user_id], post)
+        )
+        created += bulk_create_in_batches(
+            TimelineEntry, entries, FEED_FANOUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    return created
+
+
+def resume_fan_out(author_id):
+    """Вызывается после уменьшения счетчика постов автора.
+
+    Если постов стало ровно FEED_FANOUT_MAX_AUTHOR_POSTS, автор только
+    что вернулся к раскладке при записи: его посты больше не
+    подмешиваются при чтении, и написанные сверх порога раскладываются
+    сейчас, иначе они пропали бы из лент.
+    """
+    crossed = AuthorPostCounter.objects.filter(
+        author_id=author_id, posts_count=FEED_FANOUT_MAX_AUTHOR_POSTS
+    ).exists()
+    if crossed:
+        fan_out_authors([author_id])
+
+
+def remove_from_timeline(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follows_summary(user):
+    """Подписки пользователя одним запросом.
+
+    Возвращает подпись подписок (их число и id последней: меняется
+    при любой подписке и отписке) и авторов, чьи посты добавляются
+    в ленту при чтении.
+    """
+    follows = Follow.objects.filter(user=user).values_list(
+        'pk', 'author_id', 'author__post_counter__posts_count'
+    )
+    ids = []
+    pulled_authors = []
+    for pk, author_id, posts_count in follows:
+        ids.append(pk)
+        if (posts_count or 0) > FEED_FANOUT_MAX_AUTHOR_POSTS:
+            pulled_authors.append(author_id)
+    signature = f'{len(ids)}:{max(ids, default=0)}'
+    return signature, pulled_authors
+
+
+def timeline_posts(user, pulled_authors):
+    """Посты ленты подписок; pulled_authors - из follows_summary."""
+    posts = Post.objects.for_feed()
+    if not pulled_authors:
+        # Сортировка по колонкам ленты, а не поста: так база идет
+        # по индексу ленты без сортировки
+        return posts.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__pub_date', '-timeline_entries__id'
+        )
+    return posts.filter(
+        Q(pk__in=TimelineEntry.objects.filter(
+            user=user
+        ).values('post_id'))
+        | Q(author_id__in=pulled_authors)
+    )
+
+
+def newest_timeline_entry(user):
+    """id самой свежей записи ленты: первая строка индекса ленты."""
+    return TimelineEntry.objects.filter(user=user).order_by(
+        '-pub_date', '-id'
+    ).values_list('pk', flat=True).first()
+
+
+def timeline_count(user):
+    return TimelineEntry.objects.filter(user=user).count()
@@ -1,23 +1,175 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import connections, router
+from django.db.models import Count, Max
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
+from core.db.routers import read_from_replica
+from core.db.sqlite import serialize_writes
+from core.db.statistics import estimate_table_rows
 
+from .cache import (cache_page_for_anonymous, cached_stamp, conditional_page,
+                    get_cached_author_posts_count, get_group, get_post,
+                    posts_last_modified, posts_stamp)
+from .counters import get_author_posts_count
+from .export import CONTENT_TYPES, EXPORT_FORMATS, export_posts, filter_posts
 from .forms import PostForm
-from .models import Group, Post, User
+from .models import Follow, Post, User
+from .paginators import CursorPaginator, FeedPaginator
+from .search import search_posts
+from .timeline import (follows_summary, newest_timeline_entry,
+                       timeline_count, timeline_posts)
 
 NUMBER_OF_POSTS = settings.NUMBER_OF_POSTS
 
+FEED_PAGINATION = settings.FEED_PAGINATION
+
+FEED_ESTIMATED_COUNT_THRESHOLD = settings.FEED_ESTIMATED_COUNT_THRESHOLD
+
 
-def paginator_function(request, argument):
-    paginator = Paginator(argument, NUMBER_OF_POSTS)
+def paginator_function(request, argument, count=None,
+                       count_is_estimate=False):
+    """count - заранее известное число записей, точное или оценка
+    (count_is_estimate), чтобы паджинатор не считал его заново.
+    """
+    if FEED_PAGINATION == 'cursor' or 'cursor' in request.GET:
+        paginator = CursorPaginator(argument, NUMBER_OF_POSTS)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = FeedPaginator(
+        argument, NUMBER_OF_POSTS, count=count,
+        count_is_estimate=count_is_estimate,
+        estimate_threshold=FEED_ESTIMATED_COUNT_THRESHOLD,
+    )
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def all_posts_stamp():
+    """Отметка всей ленты: (время изменения, число постов, оценка ли
+    это число).
+
+    Время - MAX по индексу updated_at. На большой таблице число
+    берется из статистики планировщика, как в паджинаторе, и COUNT(*)
+    не выполняется; удаление поста попадет тогда в ETag после
+    обновления статистики. Ниже порога число точное.
+    """
+    def compute():
+        using = router.db_for_write(Post)
+        estimate = estimate_table_rows(
+            connections[using], Post._meta.db_table
+        )
+        if (estimate is not None
+                and FEED_ESTIMATED_COUNT_THRESHOLD is not None
+                and estimate >= FEED_ESTIMATED_COUNT_THRESHOLD):
+            last_modified = Post.objects.using(using).aggregate(
+                last_modified=Max('updated_at')
+            )['last_modified']
+            return last_modified, estimate, True
+        return posts_stamp(Post.objects.all()) + (False,)
+
+    return cached_stamp('index', compute)
+
+
+def author_posts_stamp(username):
+    """Время изменения и число постов автора вместе с его полным
+    именем: переименование меняет отметку профиля и без постов.
+    """
+    def compute():
+        stamp = User.objects.using(router.db_for_write(User)).filter(
+            username=username
+        ).annotate(
+            last_modified=Max('posts__updated_at'), count=Count('posts')
+        ).values_list(
+            'last_modified', 'count', 'first_name', 'last_name'
+        ).first()
+        if stamp is None:
+            return None, 0, ''
+        last_modified, count, first_name, last_name = stamp
+        return last_modified, count, f'{first_name} {last_name}'
+
+    return cached_stamp(f'author:{username}', compute)
+
+
+def index_stamp(request):
+    last_modified, count, _ = all_posts_stamp()
+    return last_modified, count
+
+
+def group_stamp(request, slug):
+    """Число постов - счетчик группы из get_group, он же идет
+    в паджинатор; запрос остается только за временем изменения.
+    """
+    group = get_group(slug)
+    last_modified = cached_stamp(
+        f'group:{slug}',
+        lambda: posts_last_modified(Post.objects.filter(group=group)),
+    )
+    version = f'{group.posts_count}|{group.title}|{group.description}'
+    return last_modified, version
+
+
+def profile_stamp(request, username):
+    last_modified, count, full_name = author_posts_stamp(username)
+    following = is_following(request, username)
+    return last_modified, f'{count}|{full_name}|{following}'
+
+
+def post_stamp(request, post_id):
+    post = get_post(post_id)
+    group_title = post.group.title if post.group else ''
+    posts_count = get_cached_author_posts_count(post.author)
+    return post.updated_at, f'{posts_count}|{group_title}'
+
+
+def follow_state(request):
+    """Подписки читателя (см. follows_summary); читаются раз на запрос."""
+    if not hasattr(request, '_follows'):
+        request._follows = follows_summary(request.user)
+    return request._follows
+
+
+def follow_stamp(request):
+    """Отметка ленты подписок без подсчета и соединений: отметка всех
+    постов (общая для читателей и лежит в кэше) меняется при любом
+    изменении постов, подпись подписок - при подписке и отписке,
+    последняя запись ленты читается по ее индексу.
+
+    Last-Modified не отдается: подписка на автора со старыми постами
+    не меняет время изменения постов.
+    """
+    last_modified, count, _ = all_posts_stamp()
+    signature, _ = follow_state(request)
+    moment = last_modified.isoformat() if last_modified else ''
+    newest = newest_timeline_entry(request.user)
+    return None, f'{moment}|{count}|{signature}|{newest}'
+
+
+def is_following(request, username):
+    """Подписан ли пользователь на автора; считается раз на запрос."""
+    if not request.user.is_authenticated:
+        return False
+    if not hasattr(request, '_following'):
+        request._following = Follow.objects.filter(
+            user=request.user, author__username=username
+        ).exists()
+    return request._following
+
+
+@read_from_replica
+@conditional_page(index_stamp)
+@cache_page_for_anonymous
 def index(request):
-    posts = Post.objects.select_related('author').all()
-    page_obj = paginator_function(request, posts)
+    posts = Post.objects.for_feed()
+    # Отметка изменения уже посчитана для ETag и лежит в кэше
+    _, count, count_is_estimate = all_posts_stamp()
+    page_obj = paginator_function(
+        request, posts, count=count, count_is_estimate=count_is_estimate
+    )
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
@@ -25,10 +177,13 @@ def index(request):
     return render(request, template, context)
 
 
+@read_from_replica
+@conditional_page(group_stamp)
+@cache_page_for_anonymous
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_function(request, posts)
+    group = get_group(slug)
+    posts = Post.objects.for_feed().filter(group=group)
+    page_obj = paginator_function(request, posts, count=group.posts_count)
     template = 'posts/group_list.html'
     context = {
         'page_obj': page_obj,
@@ -37,28 +192,90 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@read_from_replica
+@conditional_page(profile_stamp)
+@cache_page_for_anonymous
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
-    page_obj = paginator_function(request, author_posts)
+    author = get_object_or_404(
+        User.objects.select_related('post_counter'), username=username
+    )
+    author_posts = Post.objects.for_feed().filter(author=author)
+    _, count, _ = author_posts_stamp(username)
+    page_obj = paginator_function(request, author_posts, count=count)
     template = 'posts/profile.html'
+    following = is_following(request, username)
     context = {
         'author': author,
+        'posts_count': get_author_posts_count(author),
         'page_obj': page_obj,
+        'following': following,
     }
     return render(request, template, context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = Post.objects.none()
+    if query:
+        posts = search_posts(Post.objects.for_feed(), query)
+    # Результаты упорядочены по релевантности, курсор по дате не подходит
+    paginator = FeedPaginator(posts, NUMBER_OF_POSTS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    template = 'posts/search.html'
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        # Префикс ссылок паджинатора, чтобы не терять запрос
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, template, context)
+
+
+@staff_member_required
+def export(request):
+    file_format = request.GET.get('format', 'jsonl')
+    if file_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки.')
+    compress = request.GET.get('gzip') == '1'
+    try:
+        posts = filter_posts(
+            Post.objects.all(),
+            group=request.GET.get('group'),
+            author=request.GET.get('author'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    filename = f'posts.{file_format}'
+    content_type = CONTENT_TYPES[file_format]
+    if compress:
+        # Отдается как файл .gz, а не Content-Encoding: иначе браузер
+        # распакует его при сохранении
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        export_posts(file_format, posts, compress=compress),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@read_from_replica
+@conditional_page(post_stamp)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post(post_id)
     template = 'posts/post_detail.html'
     context = {
         'post': post,
+        'posts_count': get_cached_author_posts_count(post.author),
     }
     return render(request, template, context)
 
 
 @login_required
+@serialize_writes
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None)
@@ -72,11 +289,13 @@ def post_create(request):
 
 
 @login_required
+@serialize_writes
 def post_edit(request, post_id):
     is_edit = True
     template = 'posts/create_post.html'
     post = get_object_or_404(Post, pk=post_id)
-    if post.author == request.user:
+    # Сравнение по id не загружает автора отдельным запросом
+    if post.author_id == request.user.pk:
         form = PostForm(request.POST or None, instance=post)
         if form.is_valid():
             form.save()
@@ -89,3 +308,43 @@ def post_edit(request, post_id):
         return render(request, template, context)
 
     return redirect('posts:post_detail', post_id)
+
+
+@login_required
+@conditional_page(follow_stamp)
+def follow_index(request):
+    signature, pulled_authors = follow_state(request)
+    posts = timeline_posts(request.user, pulled_authors)
+    count = None
+    if not pulled_authors:
+        # Записи ленты меняются вместе с постами и подписками
+        count = cached_stamp(
+            f'timeline:{request.user.pk}:{signature}',
+            lambda: timeline_count(request.user),
+        )
+    page_obj = paginator_function(request, posts, count=count)
+    template = 'posts/follow.html'
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@login_required
+@require_POST
+@serialize_writes
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+@serialize_writes
+def profile_unfollow(request, username):
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    return redirect('posts:profile', username)
@@ -0,0 +1,6 @@
+"""Настройки проекта.
+
+yatube.settings - профиль разработки; остальные профили подключаются
+через DJANGO_SETTINGS_MODULE: yatube.settings.prod, yatube.settings.bench.
+"""
+from .dev import *  # noqa: F401,F403
@@ -0,0 +1,246 @@
+"""Общие настройки всех окружений.
+
+Профили: dev (по умолчанию, yatube.settings), prod и bench.
+"""
+import os
+
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+NUMBER_OF_POSTS = 10
+
+# Режим пагинации лент: 'pages' (номера страниц) или 'cursor' (keyset)
+FEED_PAGINATION = 'pages'
+
+# Начиная с этого числа постов лента без фильтров показывает количество
+# страниц по статистике базы (ANALYZE), а не по COUNT(*); None - всегда
+# считать точно
+FEED_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Размер пачки при раскладке поста по лентам подписчиков
+FEED_FANOUT_BATCH_SIZE = 1000
+
+# Посты авторов, у которых постов больше, не раскладываются по лентам,
+# а добавляются в ленту при чтении
+FEED_FANOUT_MAX_AUTHOR_POSTS = 10000
+
+# Сколько последних постов автора попадает в ленту при подписке
+FEED_BACKFILL_POSTS = 100
+
+# Сколько id измененных постов передается в posts_changed за раз
+# при массовом обновлении
+POSTS_CHANGED_BATCH_SIZE = 1000
+
+# Время жизни кэша заголовка группы, в секундах
+GROUP_CACHE_TIMEOUT = 60 * 15
+
+# Время жизни поста с автором и группой в кэше страницы поста, в секундах
+POST_CACHE_TIMEOUT = 60 * 15
+
+# Время жизни карточки поста в кэше фрагментов, в секундах
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+# Время жизни страниц лент в кэше для анонимных пользователей, в секундах
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Сколько хранится прошлая версия страницы ленты, которую отдают,
+# пока один запрос собирает свежую, в секундах
+PAGE_STALE_TIMEOUT = 60 * 60
+
+# Блокировка пересборки страницы снимается сама, если собиравший
+# запрос упал, в секундах
+PAGE_REBUILD_LOCK_TIMEOUT = 10
+
+# Сколько запрос без прошлой версии ждет чужой пересборки, в секундах
+PAGE_REBUILD_WAIT = 3
+
+# Доля запросов, для которых собираются метрики (от 0 до 1)
+PERF_SAMPLE_RATE = 1.0
+
+# Запросы дольше этого порога пишутся в лог, в миллисекундах
+PERF_SLOW_REQUEST_MS = 500
+
+# Сколько самых долгих SQL-запросов выводить в лог медленного запроса
+PERF_SLOW_QUERIES_LOGGED = 5
+
+# Замер времени рендеринга каждого шаблона и include
+TEMPLATE_PROFILING = False
+
+# Компиляция всех шаблонов при запуске (имеет смысл с cached loader)
+TEMPLATE_WARMUP = False
+
+NUMBER_OF_CHARACTERS_FOR_VIEWS = 30
+
+NUMBER_OF_CHARACTERS_FOR_MODELS = 15
+
+SECRET_KEY = '=231j#b#5nvk4_%8kk&k%(%tryq)(6lx=qne&3lq-le+9&+vh)'
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+]
+
+MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'core.template_backend.TimedDjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+                'core.context_processors.post_card.post_card',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+# Пул соединений внутри процесса: ENGINE core.db.backends.sqlite3
+# или core.db.backends.postgresql, параметры в POOL (см. core.db.pool)
+DATABASES = {
+    'default': {
+        'ENGINE': os.environ.get(
+            'DJANGO_DB_ENGINE', 'django.db.backends.sqlite3'
+        ),
+        'NAME': os.environ.get(
+            'DJANGO_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'USER': os.environ.get('DJANGO_DB_USER', ''),
+        'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+        'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+        'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+        # Сколько секунд соединение живет между запросами, 0 - закрывать
+        # после каждого запроса
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DJANGO_DB_POOL_SIZE', 10)),
+        },
+    }
+}
+
+# Реплики только для чтения: имена баз (пути к файлам SQLite) через
+# запятую. Схема реплик совпадает с default; локальные реплики SQLite
+# обновляет manage.py sync_sqlite_replicas
+for number, name in enumerate(
+        filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(','))):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Сколько секунд после записи браузер читает только из default
+REPLICA_STICKY_SECONDS = 10
+
+REPLICA_STICKY_COOKIE = 'primary_reads'
+
+# Прагмы для каждого нового соединения с SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КБ
+    'cache_size': -64 * 1024,
+    # Сколько миллисекунд ждать блокировку базы
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# Изменяющие view SQLite выполняются по одному (core.db.sqlite)
+SQLITE_WRITE_LOCK = True
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+STATIC_URL = '/static/'
+
+LOGIN_URL = 'users:login'
+
+LOGIN_REDIRECT_URL = 'posts:index'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
@@ -0,0 +1,45 @@
+"""Настройки для нагрузочных замеров (manage.py bench_views).
+
+Как в бою, но в одном процессе: локальный кэш, SQLite и обычная
+статика, чтобы не требовались memcached и collectstatic. Ключ из
+base, поэтому DJANGO_SECRET_KEY, обязательный в бою, здесь не нужен.
+"""
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, TEMPLATES
+
+DEBUG = False
+
+# Реплики из DJANGO_DB_REPLICAS (base) сохраняются вместе с default
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': 60}
+    for alias, database in DATABASES.items()
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Как в бою: шаблоны компилируются один раз на процесс
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+TEMPLATE_WARMUP = True
+
+TEMPLATE_PROFILING = False
+
+# Метрики запросов не должны искажать замер
+PERF_SAMPLE_RATE = 0
+
+# Локальный кэш и обычная статика здесь выбраны намеренно
+SILENCED_SYSTEM_CHECKS = ['core.W003', 'core.W008']
@@ -0,0 +1,86 @@
+"""Настройки для боевого окружения.
+
+Запуск: DJANGO_SETTINGS_MODULE=yatube.settings.prod.
+Секреты и адреса служб берутся из переменных окружения;
+без DJANGO_SECRET_KEY профиль не загружается.
+"""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, DATABASES, TEMPLATES
+
+DEBUG = False
+
+# Ключ из base лежит в репозитории, в бою он не годится
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = os.environ.get(
+    'DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1'
+).split(',')
+
+# Соединение с базой переживает запрос и используется повторно.
+# Реплики из DJANGO_DB_REPLICAS (base) сохраняются вместе с default
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 60))
+
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': CONN_MAX_AGE}
+    for alias, database in DATABASES.items()
+}
+
+# Общий для всех воркеров кэш: поколения лент и кэш страниц
+# должны сбрасываться сразу во всех процессах. Перед ним - память
+# воркера для мелких горячих ключей, которые сбрасываются удалением
+# или не меняются (см. core.cache)
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'LOCAL_TIMEOUT': 30,
+            'VERSION_CHECK_INTERVAL': 1,
+            'LOCAL_KEY_PREFIXES': [
+                'posts:group:',
+                'posts:post:',
+                'posts:author_posts_count:',
+                'template.cache.post_card.',
+            ],
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+
+# Сессия читается из кэша, база - только при промахе
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Шаблоны компилируются один раз на процесс и дальше берутся из памяти
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+TEMPLATE_WARMUP = True
+
+# Профиль шаблонов замедляет каждый include, в бою он выключен
+TEMPLATE_PROFILING = False
+
+PERF_SAMPLE_RATE = 0.05
+
+# Статика с хэшем в имени и заранее сжатыми копиями .gz
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'